@@ -0,0 +1,127 @@
+import itertools
+from collections import Counter
+
+from dataset_io import iter_transactions, run_tasks, split_byte_ranges
+
+
+def downward_closure(itemsets):
+    """
+    Return the set of all non-empty subsets of the given itemsets.
+    Itemsets are sorted tuples, as used for pattern keys.
+    """
+    closure = set()
+    pending = [tuple(sorted(itemset)) for itemset in itemsets]
+    while pending:
+        itemset = pending.pop()
+        if itemset in closure:
+            continue
+        closure.add(itemset)
+        if len(itemset) > 1:
+            for subset in itertools.combinations(itemset, len(itemset) - 1):
+                if subset not in closure:
+                    pending.append(subset)
+    return closure
+
+
+def negative_border(itemsets, items):
+    """
+    Return the negative border of a downward closed collection of itemsets:
+    the itemsets that are not in the collection but whose immediate subsets
+    all are. items is the universe used for the border singletons.
+    """
+    itemsets = set(itemsets)
+    border = {(item,) for item in items if (item,) not in itemsets}
+
+    by_length = {}
+    for itemset in itemsets:
+        by_length.setdefault(len(itemset), []).append(itemset)
+
+    # Apriori join: extend every k-itemset with the last item of a k-itemset
+    # sharing its first k-1 items.
+    for k, level in by_length.items():
+        groups = {}
+        for itemset in level:
+            groups.setdefault(itemset[:-1], []).append(itemset[-1])
+        for prefix, tails in groups.items():
+            tails.sort()
+            for a, b in itertools.combinations(tails, 2):
+                candidate = prefix + (a, b)
+                if candidate in itemsets:
+                    continue
+                if all(subset in itemsets
+                       for subset in itertools.combinations(candidate, k)):
+                    border.add(candidate)
+    return border
+
+
+def count_supports(transactions, candidates, chunk_size=1 << 16):
+    """
+    Count the exact support of every candidate itemset in one pass.
+
+    Transactions are read in chunks of chunk_size. For every chunk, each
+    candidate item gets a bitset of the transactions holding it, and a
+    candidate's support is the popcount of the AND of its items' bitsets.
+    Candidates are visited in sorted order so the AND of a shared prefix is
+    computed once. Returns the candidate supports and the support of every
+    single item seen.
+    """
+    candidates = sorted({tuple(sorted(c)) for c in candidates})
+    candidate_items = {item for candidate in candidates for item in candidate}
+    supports = dict.fromkeys(candidates, 0)
+    item_counts = Counter()
+
+    transactions = iter(transactions)
+    while True:
+        chunk = list(itertools.islice(transactions, chunk_size))
+        if not chunk:
+            break
+
+        rows = {item: bytearray((len(chunk) + 7) // 8) for item in candidate_items}
+        for j, transaction in enumerate(chunk):
+            transaction = set(transaction)
+            item_counts.update(transaction)
+            for item in transaction & candidate_items:
+                rows[item][j >> 3] |= 1 << (j & 7)
+        bits = {item: int.from_bytes(row, 'little') for item, row in rows.items()}
+
+        # prefix[k] is the AND of the bitsets of candidate[0..k]
+        prefix = []
+        previous = ()
+        for candidate in candidates:
+            common = 0
+            while common < len(previous) and common < len(candidate) - 1 \
+                    and previous[common] == candidate[common]:
+                common += 1
+            del prefix[common:]
+            for item in candidate[common:]:
+                prefix.append(prefix[-1] & bits[item] if prefix else bits[item])
+            supports[candidate] += prefix[-1].bit_count()
+            previous = candidate
+
+    return supports, item_counts
+
+
+def _count_range(args):
+    file_path, start, end, candidates = args
+    return count_supports(iter_transactions(file_path, start, end), candidates)
+
+
+def verify_candidates(dataset, candidates, workers=1):
+    """
+    Count the exact support of the candidates in one pass over the full
+    dataset (a list of transactions or the path of a .dat file). Files can
+    be split into byte ranges counted by a process pool.
+    """
+    if not isinstance(dataset, str):
+        return count_supports(dataset, candidates)
+
+    tasks = [(dataset, start, end, candidates) for start, end in split_byte_ranges(dataset, workers)]
+    results = run_tasks(_count_range, tasks, workers)
+
+    supports = dict.fromkeys((tuple(sorted(c)) for c in candidates), 0)
+    item_counts = Counter()
+    for counts, items in results:
+        for candidate, count in counts.items():
+            supports[candidate] += count
+        item_counts.update(items)
+    return supports, item_counts
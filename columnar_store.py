@@ -0,0 +1,432 @@
+import hashlib
+import json
+import mmap
+import shutil
+import struct
+import tempfile
+from array import array
+
+import numpy as np
+
+MAGIC = b"DTCOLS01"
+ALIGNMENT = 64
+SPOOL_ENTRIES = 1 << 16
+
+
+def itemset_hash(ids):
+    """
+    Stable 64-bit hash of a sorted tuple of item ids, used to find an
+    itemset without scanning the file.
+    """
+    digest = hashlib.blake2b(array("q", ids).tobytes(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class _Column():
+    """
+    A column spooled to a temporary file in blocks as rows are added.
+    """
+    def __init__(self, typecode, dtype):
+        self.buffer = array(typecode)
+        self.dtype = dtype
+        self.length = 0
+        self.spool = tempfile.TemporaryFile()
+
+    def append(self, value):
+        self.buffer.append(value)
+        if len(self.buffer) >= SPOOL_ENTRIES:
+            self.flush()
+
+    def extend(self, values):
+        self.buffer.extend(values)
+        if len(self.buffer) >= SPOOL_ENTRIES:
+            self.flush()
+
+    def flush(self):
+        self.buffer.tofile(self.spool)
+        self.length += len(self.buffer)
+        del self.buffer[:]
+
+    def read(self):
+        self.flush()
+        self.spool.seek(0)
+        return np.fromfile(self.spool, dtype=self.dtype, count=self.length)
+
+
+class _ColumnWriter():
+    """
+    Common part of the writers: the item dictionary, the columns and the
+    file layout.
+
+    A file is MAGIC, the length of a JSON header as a little-endian uint64,
+    the header, and the columns as raw little-endian arrays, each aligned
+    to ALIGNMENT bytes. The header gives the kind of file, the number of
+    rows and, for every column, its dtype, offset and length. Items are
+    stored as integer ids; the item dictionary is the UTF-8 text of the
+    items (names_data) and its offsets.
+    """
+    kind = None
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.ids = {}
+        self.names = []
+        self.count = 0
+        self.columns = {}
+
+    def _column(self, name, typecode, dtype):
+        self.columns[name] = _Column(typecode, dtype)
+
+    def _encode(self, itemset):
+        ids = self.ids
+        encoded = []
+        for item in itemset:
+            item_id = ids.get(item)
+            if item_id is None:
+                item_id = ids[item] = len(self.names)
+                self.names.append(item)
+            encoded.append(item_id)
+        encoded.sort()
+        return encoded
+
+    def _sorted_hashes(self, name):
+        """
+        Replace the hash column by its sorted values plus the row of each.
+        """
+        column = self.columns.pop(name)
+        hashes = column.read()
+        column.spool.close()
+        order = np.argsort(hashes, kind="stable")
+        rows = order.astype(np.int32 if len(order) < 1 << 31 else np.int64)
+        return {name: hashes[order], name + "_rows": rows}
+
+    def _finish(self):
+        """
+        Columns computed once every row is known.
+        """
+        return {}
+
+    def close(self):
+        """
+        Write the file.
+        """
+        encoded = [str(name).encode() for name in self.names]
+        name_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        name_offsets[1:] = np.cumsum([len(e) for e in encoded])
+        arrays = self._finish()
+        arrays["names_offsets"] = name_offsets
+        arrays["names_data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        sources = {name: column for name, column in self.columns.items()}
+        sources.update(arrays)
+
+        # Lay the columns out after a header of fixed upper size.
+        sizes = {}
+        for name, source in sources.items():
+            if isinstance(source, _Column):
+                source.flush()
+                sizes[name] = (np.dtype(source.dtype).str, source.length)
+            else:
+                sizes[name] = (source.dtype.str, len(source))
+        header_size = len(json.dumps({"kind": self.kind, "count": self.count, "columns": {
+            name: [dtype, 1 << 62, length] for name, (dtype, length) in sizes.items()}}))
+        offset = -(-(len(MAGIC) + 8 + header_size) // ALIGNMENT) * ALIGNMENT
+        layout = {}
+        for name, (dtype, length) in sizes.items():
+            layout[name] = [dtype, offset, length]
+            offset += -(-np.dtype(dtype).itemsize * length // ALIGNMENT) * ALIGNMENT
+        header = json.dumps({"kind": self.kind, "count": self.count, "columns": layout}).encode()
+
+        with open(self.file_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for name, source in sources.items():
+                f.write(b"\0" * (layout[name][1] - f.tell()))
+                if isinstance(source, _Column):
+                    source.spool.seek(0)
+                    shutil.copyfileobj(source.spool, f)
+                    source.spool.close()
+                else:
+                    f.write(source.tobytes())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            for column in self.columns.values():
+                column.spool.close()
+
+
+class PatternWriter(_ColumnWriter):
+    """
+    Stream patterns to a columnar file: the item ids of all patterns in one
+    flat column with their offsets, and a support column.
+    """
+    kind = "patterns"
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self._column("offsets", "q", np.int64)
+        self._column("items", "i", np.int32)
+        self._column("support", "q", np.int64)
+        self._column("hash", "Q", np.uint64)
+        self.columns["offsets"].append(0)
+        self.end = 0
+
+    def add(self, pattern, support):
+        ids = self._encode(pattern)
+        self.end += len(ids)
+        self.columns["items"].extend(ids)
+        self.columns["offsets"].append(self.end)
+        self.columns["support"].append(support)
+        self.columns["hash"].append(itemset_hash(ids))
+        self.count += 1
+
+    def _finish(self):
+        return self._sorted_hashes("hash")
+
+
+class RuleWriter(_ColumnWriter):
+    """
+    Stream association rules to a columnar file: antecedent and consequent
+    item ids in flat columns with offsets, and a confidence column.
+    """
+    kind = "rules"
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        for side in ("antecedent", "consequent"):
+            self._column(side + "_offsets", "q", np.int64)
+            self._column(side + "_items", "i", np.int32)
+            self.columns[side + "_offsets"].append(0)
+        self._column("confidence", "d", np.float64)
+        self._column("hash", "Q", np.uint64)
+        self.ends = {"antecedent": 0, "consequent": 0}
+
+    def add(self, antecedent, consequent, confidence):
+        antecedent_ids = self._encode(antecedent)
+        for side, ids in (("antecedent", antecedent_ids), ("consequent", self._encode(consequent))):
+            self.ends[side] += len(ids)
+            self.columns[side + "_items"].extend(ids)
+            self.columns[side + "_offsets"].append(self.ends[side])
+        self.columns["confidence"].append(confidence)
+        self.columns["hash"].append(itemset_hash(antecedent_ids))
+        self.count += 1
+
+    def _finish(self):
+        return self._sorted_hashes("hash")
+
+
+def write_patterns(file_path, patterns):
+    """
+    Write a pattern dict (pattern -> support) with a PatternWriter.
+    """
+    with PatternWriter(file_path) as writer:
+        for pattern, support in patterns.items():
+            writer.add(pattern, support)
+
+
+def write_rules(file_path, rules):
+    """
+    Write the output of generate_association_rules with a RuleWriter.
+    """
+    with RuleWriter(file_path) as writer:
+        for antecedent, (consequent, confidence) in rules.items():
+            writer.add(antecedent, consequent, confidence)
+
+
+class _ColumnReader():
+    """
+    Memory-mapped view of a file written by a writer. Columns are NumPy
+    arrays over the mapping, so only the pages that are touched are read.
+    """
+    kind = None
+
+    def __init__(self, file_path):
+        self._file = open(file_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"'{file_path}' is not a columnar pattern file")
+        size, = struct.unpack_from("<Q", self._map, len(MAGIC))
+        header = json.loads(self._map[len(MAGIC) + 8:len(MAGIC) + 8 + size])
+        if header["kind"] != self.kind:
+            self.close()
+            raise ValueError(f"'{file_path}' holds {header['kind']}, not {self.kind}")
+        self.count = header["count"]
+        self.columns = {name: np.frombuffer(self._map, dtype=dtype, count=length, offset=offset)
+                        if length else np.empty(0, dtype=dtype)
+                        for name, (dtype, offset, length) in header["columns"].items()}
+
+        offsets = self.columns["names_offsets"].tolist()
+        data = self.columns["names_data"].tobytes()
+        self.names = [data[start:end].decode() for start, end in zip(offsets, offsets[1:])]
+        self.ids = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.columns = {}
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _ids(self, items):
+        """
+        Sorted ids of items, or None if an item is not in the file.
+        """
+        ids = [self.ids.get(str(item)) for item in items]
+        return None if None in ids else sorted(ids)
+
+    def _find(self, ids):
+        """
+        Rows whose hashed itemset may be ids.
+        """
+        key = itemset_hash(ids)
+        hashes = self.columns["hash"]
+        start = np.searchsorted(hashes, key, side="left")
+        end = np.searchsorted(hashes, key, side="right")
+        return self.columns["hash_rows"][start:end].tolist()
+
+    def _itemset(self, side, row):
+        offsets = self.columns[side + "offsets"]
+        ids = self.columns[side + "items"][offsets[row]:offsets[row + 1]]
+        return tuple(sorted(self.names[i] for i in ids.tolist()))
+
+    def _containing(self, side, items):
+        """
+        Mask of the rows whose itemset on side holds every one of items.
+        """
+        ids = self._ids(items)
+        if ids is None:
+            return np.zeros(self.count, dtype=bool)
+        offsets = self.columns[side + "offsets"]
+        flat = np.isin(self.columns[side + "items"], ids).astype(np.int64)
+        if not len(flat):
+            return np.zeros(self.count, dtype=bool)
+        return np.add.reduceat(flat, offsets[:-1]) == len(ids)
+
+
+class PatternReader(_ColumnReader):
+    """
+    Memory-mapped reader of a pattern file. reader[i] is the i-th pattern
+    and its support; support(pattern) looks a pattern up by its items and
+    filter selects rows by support, length and items.
+    """
+    kind = "patterns"
+
+    def __getitem__(self, row):
+        return self._itemset("", row), int(self.columns["support"][row])
+
+    def __iter__(self):
+        for row in range(self.count):
+            yield self[row]
+
+    def support(self, pattern):
+        """
+        Support of pattern, or None if it is not in the file.
+        """
+        ids = self._ids(pattern)
+        if ids is None:
+            return None
+        offsets = self.columns["offsets"]
+        items = self.columns["items"]
+        for row in self._find(ids):
+            if items[offsets[row]:offsets[row + 1]].tolist() == ids:
+                return int(self.columns["support"][row])
+        return None
+
+    def filter(self, min_support=None, max_support=None, min_length=None, max_length=None,
+               contains=None):
+        """
+        Rows of the patterns meeting every given condition, as an array.
+        contains is a collection of items every pattern must hold.
+        """
+        mask = np.ones(self.count, dtype=bool)
+        support = self.columns["support"]
+        if min_support is not None:
+            mask &= support >= min_support
+        if max_support is not None:
+            mask &= support <= max_support
+        if min_length is not None or max_length is not None:
+            lengths = np.diff(self.columns["offsets"])
+            if min_length is not None:
+                mask &= lengths >= min_length
+            if max_length is not None:
+                mask &= lengths <= max_length
+        if contains:
+            mask &= self._containing("", contains)
+        return np.nonzero(mask)[0]
+
+    def to_dict(self, rows=None):
+        """
+        The patterns of rows (all by default) as a pattern dict.
+        """
+        rows = range(self.count) if rows is None else rows
+        return dict(self[row] for row in rows)
+
+
+class RuleReader(_ColumnReader):
+    """
+    Memory-mapped reader of a rule file. reader[i] is the i-th rule as
+    (antecedent, consequent, confidence); rule(antecedent) looks a rule up
+    and filter selects rows by confidence and items.
+    """
+    kind = "rules"
+
+    def __getitem__(self, row):
+        return (self._itemset("antecedent_", row), self._itemset("consequent_", row),
+                float(self.columns["confidence"][row]))
+
+    def __iter__(self):
+        for row in range(self.count):
+            yield self[row]
+
+    def rule(self, antecedent):
+        """
+        (consequent, confidence) of the rule for antecedent, or None.
+        """
+        ids = self._ids(antecedent)
+        if ids is None:
+            return None
+        offsets = self.columns["antecedent_offsets"]
+        items = self.columns["antecedent_items"]
+        for row in self._find(ids):
+            if items[offsets[row]:offsets[row + 1]].tolist() == ids:
+                _, consequent, confidence = self[row]
+                return consequent, confidence
+        return None
+
+    def filter(self, min_confidence=None, antecedent_contains=None, consequent_contains=None):
+        """
+        Rows of the rules meeting every given condition, as an array.
+        """
+        mask = np.ones(self.count, dtype=bool)
+        if min_confidence is not None:
+            mask &= self.columns["confidence"] >= min_confidence
+        if antecedent_contains:
+            mask &= self._containing("antecedent_", antecedent_contains)
+        if consequent_contains:
+            mask &= self._containing("consequent_", consequent_contains)
+        return np.nonzero(mask)[0]
+
+    def to_dict(self, rows=None):
+        """
+        The rules of rows (all by default) in the form of
+        generate_association_rules.
+        """
+        rows = range(self.count) if rows is None else rows
+        rules = {}
+        for row in rows:
+            antecedent, consequent, confidence = self[row]
+            rules[antecedent] = (consequent, confidence)
+        return rules
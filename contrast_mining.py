@@ -0,0 +1,117 @@
+import math
+
+from dataset_io import load_weighted_transactions
+from dominant_tree_algo import DominantTree, PatternConstraints
+from tree_core import weighted_transactions
+
+
+class ContrastCount():
+    """
+    A count over two datasets, (a, b), as held by the nodes of a contrast
+    tree.
+
+    Counts add up per dataset, so tree building and mining go through the
+    usual DominantTree code unchanged, and compare by their total a + b,
+    the combined support the tree is pruned by. Along a tree path both
+    parts only shrink, so the smallest count of a path by total is also
+    the smallest in each dataset. Counts are immutable; nodes may share
+    them.
+    """
+    __slots__ = ('a', 'b', 'total')
+
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+        self.total = a + b
+
+    def __add__(self, other):
+        if isinstance(other, ContrastCount):
+            return ContrastCount(self.a + other.a, self.b + other.b)
+        if other == 0:
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return ContrastCount(self.a - other.a, self.b - other.b)
+
+    def __lt__(self, other):
+        return self.total < _total(other)
+
+    def __le__(self, other):
+        return self.total <= _total(other)
+
+    def __gt__(self, other):
+        return self.total > _total(other)
+
+    def __ge__(self, other):
+        return self.total >= _total(other)
+
+    def __repr__(self):
+        return f"ContrastCount({self.a}, {self.b})"
+
+
+def _total(count):
+    return count.total if isinstance(count, ContrastCount) else count
+
+
+def _tagged(dataset, weighted, side):
+    """
+    The transactions of one dataset with their counts as ContrastCounts.
+    """
+    if isinstance(dataset, str):
+        dataset = load_weighted_transactions(dataset)
+    elif not weighted:
+        dataset = weighted_transactions(dataset)
+    if side == 0:
+        return [(transaction, ContrastCount(count, 0)) for transaction, count in dataset]
+    return [(transaction, ContrastCount(0, count)) for transaction, count in dataset]
+
+
+def find_contrast_patterns(dataset_a, dataset_b, support_threshold, min_ratio=None,
+                           min_difference=None, weighted=False, max_length=None, min_length=1,
+                           must_include=None, exclude=None):
+    """
+    Mine two datasets at once for patterns whose support differs between
+    them.
+
+    Both datasets (lists of transactions or .dat files) go into one
+    DominantTree whose node counts are ContrastCounts, built under one
+    item order as DominantTree.parallel does. It is mined at
+    support_threshold, an absolute count on the two datasets combined, so
+    one build and one mining run give the supports in both.
+
+    A pattern is returned if its relative supports in A and B, s_a and
+    s_b, have a growth rate max(s_a / s_b, s_b / s_a) of at least
+    min_ratio (infinite when one of them is 0) or differ by at least
+    min_difference. With neither given every frequent pattern is
+    returned. Returns pattern -> (support in A, support in B).
+    """
+    constraints = PatternConstraints(max_length, min_length, must_include, exclude)
+    a = _tagged(dataset_a, weighted, 0)
+    b = _tagged(dataset_b, weighted, 1)
+    size_a = sum(count.a for _, count in a) or 1
+    size_b = sum(count.b for _, count in b) or 1
+
+    totals = {}
+    for transaction, count in a + b:
+        for item in transaction:
+            totals[item] = totals.get(item, 0) + count.total
+    order = sorted(totals, key=lambda item: (-totals[item], item))
+    tree = DominantTree.parallel(a + b, support_threshold, 1, True, constraints, order=order)
+    patterns = {}
+    for pattern, count in tree.mine_patterns(support_threshold).items():
+        share_a = count.a / size_a
+        share_b = count.b / size_b
+        if min_ratio is not None:
+            low, high = sorted((share_a, share_b))
+            ratio = high / low if low else math.inf
+            if ratio >= min_ratio:
+                patterns[pattern] = (count.a, count.b)
+                continue
+        if min_difference is not None and abs(share_a - share_b) >= min_difference:
+            patterns[pattern] = (count.a, count.b)
+        elif min_ratio is None and min_difference is None:
+            patterns[pattern] = (count.a, count.b)
+    return patterns
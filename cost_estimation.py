@@ -0,0 +1,155 @@
+import math
+import sys
+import time
+
+from dominant_tree_algo import DominantTree
+from mining_budget import BudgetExceeded, MiningBudget
+from tree_core import TreeNode
+
+# Approximate sizes of the objects a mining run keeps alive: a tree node
+# with its (small) children dict, and one entry of the pattern dict on top
+# of its key tuple.
+NODE_BYTES = sys.getsizeof(TreeNode(None, 0, None)) + sys.getsizeof({})
+PATTERN_ENTRY_BYTES = 3 * 8 * 3 // 2 + sys.getsizeof(1 << 20)
+
+# Bounds of the growth exponents fitted between the two sample sizes, and
+# the shortest runtime worth fitting one to.
+NODE_GROWTH = (0.0, 1.0)
+TIME_GROWTH = (0.5, 1.25)
+MIN_FIT_SECONDS = 0.05
+
+
+def _mine_sample(sample, threshold, budget):
+    """
+    Mine sample with DominantTree under budget. Returns the pattern count,
+    the number of tree nodes, the elapsed time, the mean pattern length and
+    whether the run completed.
+
+    The tree is built under one fixed item order (DominantTree.parallel in
+    a single process), which mines every pattern. The dominant-node build
+    finds fewer patterns on a sample than on the full data, so its counts
+    would not carry over; a complete run is also the costlier one.
+    """
+    start = time.perf_counter()
+    patterns = {}
+    nodes = 0
+    complete = True
+    try:
+        tree = DominantTree.parallel(sample, threshold, 1, budget=budget)
+        nodes = sum(len(linked) for linked in tree.headers.values())
+        patterns = tree.mine_patterns(threshold)
+    except BudgetExceeded:
+        complete = False
+    elapsed = time.perf_counter() - start
+    count = len(patterns) if complete else max(len(patterns), budget.patterns)
+    length = sum(map(len, patterns)) / len(patterns) if patterns else 1.0
+    return count, nodes, elapsed, length, complete
+
+
+def _growth(small, large, bounds, default):
+    """
+    Exponent b of large / small = 2 ** b, clamped to bounds.
+    """
+    if small <= 0 or large <= 0:
+        return default
+    return min(max(math.log2(large / small), bounds[0]), bounds[1])
+
+
+def _input_bytes(sample):
+    """
+    Mean size of a loaded transaction: its list and its item strings.
+    """
+    if not sample:
+        return 0
+    return sum(sys.getsizeof(t) + sum(map(sys.getsizeof, t)) for t in sample) / len(sample)
+
+
+def estimate_mining_cost(sample, total_transactions, min_support, time_budget=30.0,
+                         max_patterns=5000000, timed=True):
+    """
+    Predict the cost of mining the full dataset with DominantTree at
+    min_support, a fraction of the transactions, from a random sample of
+    it (e.g. the one kept by profile_dataset).
+
+    The sample is mined at the same relative support. The number of
+    patterns at a relative support hardly depends on the number of
+    transactions, so it is taken from the sample as is. Tree size and
+    runtime grow with the data, so with timed=True the first half of the
+    sample is mined too and their growth between the two sizes is fitted
+    as a power law and extrapolated to total_transactions. Peak memory is
+    the loaded transactions plus the top-level tree plus the pattern dict;
+    conditional trees are smaller and built one at a time.
+
+    The sample runs stop at time_budget seconds or max_patterns patterns.
+    A run that stops is a blow-up at this support: Complete is then False
+    and the figures are lower bounds.
+    """
+    n = len(sample)
+    scale = total_transactions / n if n else 0.0
+    threshold = min_support * n
+    count, nodes, elapsed, length, complete = _mine_sample(
+        sample, threshold, MiningBudget(time_budget, max_patterns))
+
+    node_growth, time_growth = NODE_GROWTH[1], 1.0
+    if timed and complete and n > 1 and scale > 1:
+        half = sample[:n // 2]
+        _, half_nodes, half_elapsed, _, _ = _mine_sample(
+            half, min_support * len(half), MiningBudget(time_budget, max_patterns))
+        node_growth = _growth(half_nodes, nodes, NODE_GROWTH, node_growth)
+        if half_elapsed >= MIN_FIT_SECONDS:
+            time_growth = _growth(half_elapsed, elapsed, TIME_GROWTH, time_growth)
+
+    full_nodes = nodes * scale ** node_growth if scale > 1 else nodes
+    runtime = elapsed * scale ** time_growth if scale > 1 else elapsed
+    pattern_bytes = sys.getsizeof(tuple(range(round(length)))) + PATTERN_ENTRY_BYTES
+    memory = (_input_bytes(sample) * total_transactions + full_nodes * NODE_BYTES
+              + count * pattern_bytes)
+
+    return {
+        "Min Support": min_support,
+        "Threshold": min_support * total_transactions,
+        "Sample Size": n,
+        "Expected Patterns": count,
+        "Tree Nodes": int(full_nodes),
+        "Peak Memory (Bytes)": int(memory),
+        "Runtime (Seconds)": runtime,
+        "Complete": complete,
+    }
+
+
+def recommend_support(sample, total_transactions, target_patterns=100000, target_time=None,
+                      tolerance=0.02, time_budget=30.0):
+    """
+    Lowest min_support whose estimated cost stays within target_patterns
+    patterns and, when given, target_time seconds on the full dataset.
+
+    The pattern count only grows as the support falls, so the support is
+    found by bisection over the sample thresholds, to within a relative
+    tolerance.
+    Every probe mines the sample with a budget of target_patterns + 1
+    patterns, so probes below the answer stop early instead of blowing up.
+    Returns the support and its estimate (see estimate_mining_cost).
+    """
+    n = len(sample)
+    if n == 0:
+        return None, None
+    max_patterns = None if target_patterns is None else target_patterns + 1
+    timed = target_time is not None
+
+    def fits(estimate):
+        return (estimate["Complete"]
+                and (target_patterns is None or estimate["Expected Patterns"] <= target_patterns)
+                and (target_time is None or estimate["Runtime (Seconds)"] <= target_time))
+
+    # Bisect the sample threshold over (low, high]: high always fits.
+    low, high = 0, n
+    best = estimate_mining_cost(sample, total_transactions, 1.0, time_budget, max_patterns, timed)
+    while high - low > max(1, high * tolerance):
+        middle = (low + high) // 2
+        estimate = estimate_mining_cost(sample, total_transactions, middle / n, time_budget,
+                                        max_patterns, timed)
+        if fits(estimate):
+            high, best = middle, estimate
+        else:
+            low = middle
+    return high / n, best
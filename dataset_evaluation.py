@@ -1,10 +1,19 @@
-import numpy as np
+import heapq
+import math
 import os
+import random
 from collections import Counter
 
-def get_mining_recommendations(analysis_results):
+from cost_estimation import recommend_support
+from dataset_io import iter_transactions, run_tasks, split_byte_ranges
+
+def get_mining_recommendations(analysis_results, target_patterns=100000, target_time=None):
     """
     Generates mining recommendations based on dataset characteristics.
+    When the analysis holds a sample, the support is a concrete one,
+    estimated to yield at most target_patterns patterns (and to run within
+    target_time seconds) on the full dataset; see recommend_support.
+    Otherwise a starting range is given by dataset type.
     """
     avg_len = float(analysis_results["--- Transaction Length ---"]["Average Length"])
     dataset_type = analysis_results["--- Dataset Density ---"]["Determination"]
@@ -28,35 +37,127 @@ def get_mining_recommendations(analysis_results):
         recommendation["Recommended Range"] = "5% - 15%"
         recommendation["Advice"] = "This is a good starting range to find initial patterns. If no patterns are found, you can safely lower the threshold."
 
+    sample = analysis_results.get("Sample")
+    if sample:
+        total = analysis_results["--- General Metrics ---"]["Total Transactions"]
+        support, estimate = recommend_support(sample, total, target_patterns, target_time)
+        del recommendation["Recommended Range"]
+        recommendation["Recommended Support"] = f"{support:.2%}"
+        recommendation["Recommended Threshold"] = int(math.ceil(support * total))
+        recommendation["Expected Patterns"] = estimate["Expected Patterns"]
+        recommendation["Peak Memory (MBytes)"] = round(estimate["Peak Memory (Bytes)"] / 2**20, 1)
+        recommendation["Runtime (Seconds)"] = round(estimate["Runtime (Seconds)"], 2)
+
     return recommendation
 
 
 
-def analyze_dataset(file_path):
+def _profile_range(args):
+    """
+    Profiles the transactions of one byte range of a .dat file in one pass.
+    Returns the transaction count, item counts, length histogram and, when
+    sample_size is set, a reservoir sample of the range.
+    """
+    file_path, start, end, chunk_size, sample_size, seed = args
+    rng = random.Random(seed)
+
+    num_transactions = 0
+    item_counts = Counter()
+    length_histogram = Counter()
+    reservoir = []
+
+    for transaction in iter_transactions(file_path, start, end, chunk_size):
+        num_transactions += 1
+        item_counts.update(transaction)
+        length_histogram[len(transaction)] += 1
+
+        # --- Reservoir sampling (Algorithm R) ---
+        if sample_size:
+            if len(reservoir) < sample_size:
+                reservoir.append(transaction)
+            else:
+                slot = rng.randrange(num_transactions)
+                if slot < sample_size:
+                    reservoir[slot] = transaction
+
+    return num_transactions, item_counts, length_histogram, reservoir
+
+
+def _merge_reservoirs(parts, sample_size, rng):
+    """
+    Draws a uniform sample of sample_size transactions from the reservoirs
+    of several byte ranges, given as (transactions seen, reservoir) pairs.
+    """
+    remaining = [seen for seen, _ in parts]
+    pools = [list(reservoir) for _, reservoir in parts]
+    sample = []
+
+    while len(sample) < sample_size and sum(remaining) > 0:
+        i = rng.choices(range(len(pools)), weights=remaining)[0]
+        pool = pools[i]
+        sample.append(pool.pop(rng.randrange(len(pool))))
+        remaining[i] -= 1
+
+    return sample
+
+
+def profile_dataset(file_path, workers=1, chunk_size=1 << 20, sample_size=None, seed=None):
+    """
+    Streams a .dat file once and collects item counts, the transaction
+    length histogram and, optionally, a reservoir sample of sample_size
+    transactions. Memory is bounded by the number of distinct items and
+    the sample size, not by the size of the file. With workers > 1 the
+    file is split into byte ranges profiled by separate processes.
+    """
+    ranges = split_byte_ranges(file_path, workers)
+    seeds = [None if seed is None else seed + i for i in range(len(ranges))]
+    tasks = [(file_path, start, end, chunk_size, sample_size, s) for (start, end), s in zip(ranges, seeds)]
+
+    results = run_tasks(_profile_range, tasks, workers)
+
+    num_transactions = 0
+    item_counts = Counter()
+    length_histogram = Counter()
+    for n, counts, lengths, _ in results:
+        num_transactions += n
+        item_counts.update(counts)
+        length_histogram.update(lengths)
+
+    sample = None
+    if sample_size:
+        sample = _merge_reservoirs([(r[0], r[3]) for r in results], sample_size, random.Random(seed))
+
+    return num_transactions, item_counts, length_histogram, sample
+
+
+def analyze_dataset(file_path, workers=1, chunk_size=1 << 20, sample_size=None, seed=None,
+                    target_patterns=100000, target_time=None):
     """
     Analyzes a .dat file to compute key metrics for association rule mining.
+    The file is streamed in a single pass (see profile_dataset), so files
+    larger than memory can be analyzed. With sample_size set, the support
+    recommendation is estimated from a sample of that many transactions;
+    otherwise only a starting range is recommended.
     """
     if not os.path.exists(file_path):
         print(f"Error: File not found at '{file_path}'")
         return None
 
     try:
-        with open(file_path, 'r') as f:
-            records = [line.strip().split() for line in f if line.strip()]
+        num_transactions, item_counts, length_histogram, sample = profile_dataset(
+            file_path, workers, chunk_size, sample_size, seed)
     except Exception as e:
         print(f"Error reading or processing file: {e}")
         return None
 
-    if not records:
+    if num_transactions == 0:
         print("Error: The dataset is empty or could not be read properly.")
         return None
 
-    num_transactions = len(records)
-    all_items = [item for transaction in records for item in transaction]
-    num_unique_items = len(set(all_items))
-    transaction_lengths = [len(t) for t in records]
+    num_unique_items = len(item_counts)
+    total_item_instances = sum(length * count for length, count in length_histogram.items())
+    average_length = total_item_instances / num_transactions
 
-    total_item_instances = len(all_items)
     total_possible_instances = num_transactions * num_unique_items
     density = total_item_instances / total_possible_instances if total_possible_instances > 0 else 0
 
@@ -77,9 +178,9 @@ def analyze_dataset(file_path):
             "Total Unique Items": num_unique_items,
         },
         "--- Transaction Length ---": {
-            "Max Length": max(transaction_lengths) if transaction_lengths else 0,
-            "Min Length": min(transaction_lengths) if transaction_lengths else 0,
-            "Average Length": f"{np.mean(transaction_lengths):.2f}" if transaction_lengths else "0.00",
+            "Max Length": max(length_histogram),
+            "Min Length": min(length_histogram),
+            "Average Length": f"{average_length:.2f}",
         },
         "--- Dataset Density ---": {
             "Density": f"{density:.6f}",
@@ -87,14 +188,20 @@ def analyze_dataset(file_path):
             "Explanation": "Density is the proportion of non-empty cells in the transaction-item matrix. Classification considers scale and structure."
         },
         "--- Item Frequency (Top 5) ---": {
-            item: count for item, count in Counter(all_items).most_common(5)
+            item: count for item, count in item_counts.most_common(5)
         },
         "--- Item Frequency (Bottom 5) ---": {
-            item: count for item, count in Counter(all_items).most_common()[:-6:-1]
-        }
+            item: count for item, count in heapq.nsmallest(5, item_counts.items(), key=lambda x: x[1])
+        },
+        "Item Counts": item_counts,
+        "Length Histogram": dict(sorted(length_histogram.items())),
     }
 
-    analysis_results["--- Mining Recommendations ---"] = get_mining_recommendations(analysis_results)
+    if sample is not None:
+        analysis_results["Sample"] = sample
+
+    analysis_results["--- Mining Recommendations ---"] = get_mining_recommendations(
+        analysis_results, target_patterns, target_time)
 
     return analysis_results
 
@@ -113,7 +220,7 @@ def print_analysis(results):
     print(f"Analysis for: {results['File Path']}\n")
 
     for category, metrics in results.items():
-        if isinstance(metrics, dict):
+        if category.startswith("---") and isinstance(metrics, dict):
             print(f"--- {category.strip('---')} ---")
             for key, value in metrics.items():
                 print(f"  {key:<25}: {value}")
@@ -123,5 +230,5 @@ def print_analysis(results):
 if __name__ == '__main__':
     # Set your file here
     dat_filename = "webdocs.dat"  # <--- CHANGE THIS TO TEST OTHER FILES
-    analysis = analyze_dataset(dat_filename)
+    analysis = analyze_dataset(dat_filename, workers=os.cpu_count() or 1)
     print_analysis(analysis)
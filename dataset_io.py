@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def split_byte_ranges(file_path, parts):
+    """
+    Split a file into at most `parts` contiguous byte ranges [start, end).
+    """
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return []
+    step = -(-size // max(1, min(parts, size)))
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def iter_transactions(file_path, start=0, end=None, chunk_size=1 << 20):
+    """
+    Stream the transactions of a .dat file as lists of items.
+
+    The file is read in blocks of chunk_size bytes. Only the lines that
+    begin inside the byte range [start, end) are returned, so a file split
+    with split_byte_ranges is read exactly once across all of its ranges.
+    Empty lines are skipped.
+    """
+    with open(file_path, 'rb') as f:
+        if end is None:
+            end = os.fstat(f.fileno()).st_size
+        if start > 0:
+            # The line running over start belongs to the previous range.
+            f.seek(start - 1)
+            if f.read(1) != b'\n':
+                f.readline()
+        pos = f.tell()
+        rest = b''
+
+        while pos < end:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                lines = [rest]
+            else:
+                lines = (rest + chunk).split(b'\n')
+                rest = lines.pop()
+
+            for line in lines:
+                if pos >= end:
+                    return
+                pos += len(line) + 1
+                items = line.decode().split()
+                if items:
+                    yield items
+
+            if not chunk:
+                return
+
+
+def count_transactions(file_path, start=0, end=None):
+    """
+    Count the non-empty lines that begin inside the byte range [start, end),
+    without splitting them into items.
+    """
+    count = 0
+    with open(file_path, 'rb', buffering=1 << 20) as f:
+        if end is None:
+            end = os.fstat(f.fileno()).st_size
+        if start > 0:
+            f.seek(start - 1)
+            if f.read(1) != b'\n':
+                f.readline()
+        pos = f.tell()
+        for line in f:
+            if pos >= end:
+                break
+            pos += len(line)
+            if not line.isspace():
+                count += 1
+    return count
+
+
+def load_weighted_transactions(file_path, start=0, end=None, chunk_size=1 << 20):
+    """
+    Read a .dat file and collapse duplicate baskets as they are read.
+
+    Returns a list of (transaction, count) pairs, one per distinct basket
+    in order of first appearance, which every miner accepts with
+    weighted=True.
+    """
+    baskets = {}
+    for transaction in iter_transactions(file_path, start, end, chunk_size):
+        key = frozenset(transaction)
+        entry = baskets.get(key)
+        if entry is None:
+            baskets[key] = [transaction, 1]
+        else:
+            entry[1] += 1
+    return [(transaction, count) for transaction, count in baskets.values()]
+
+
+def run_tasks(function, tasks, workers=1):
+    """
+    Apply function to every task and return the results in order. With
+    workers > 1 and more than one task the tasks run in a process pool.
+    """
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(function, tasks))
+    return [function(task) for task in tasks]
@@ -1,73 +1,237 @@
 import time
 import itertools
+import json
+import math
 import os
 import psutil
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from dataset_io import iter_transactions, load_weighted_transactions, run_tasks, split_byte_ranges
+from mining_budget import BudgetExceeded, MiningBudget
+from mining_checkpoint import MiningCheckpoint, dataset_fingerprint
+from pair_counting import PairCounts, hash_pair_filter
+from tree_core import (TreeNode, HeaderTable, cached_prefix_path, find_frequent_items,
+                       flatten_tree, insert_transaction, merge_flat_tree, prefix_path,
+                       tree_has_single_path, weighted_transactions)
+
+#nodes come from the shared tree core: children are hashed by item
+treeNode = TreeNode
+
+#constraints on the mined patterns
+class PatternConstraints():
+    """
+    Length and item constraints pushed into the mining recursion.
 
-#class for the nodes
-class treeNode():
-    def __init__(self, nameValue, numOccur, parentNode):
-        self.name = nameValue
-        self.count = numOccur
-        self.parent = parentNode     
-        self.children = {}
-        
-    def inc(self, numOccur):
-        self.count += numOccur
+    Patterns must have between min_length and max_length items, contain at
+    least one item of must_include (when given) and no item of exclude.
+    """
+    def __init__(self, max_length=None, min_length=1, must_include=None, exclude=None):
+        self.max_length = max_length
+        self.min_length = min_length
+        self.must_include = frozenset(must_include or ())
+        self.exclude = frozenset(exclude or ())
 
-    def dec(self, numOccur):
-        self.count -= numOccur
-            
-    def disp(self, ind=1):
-        print ('  '*ind, self.name, ' ', self.count)
-        for child in self.children.values():
-            child.disp(ind+1)  
+    def satisfied_by(self, suffix):
+        """
+        True if the suffix already holds a required item.
+        """
+        return not self.must_include or not self.must_include.isdisjoint(suffix)
+
+    def accepts(self, pattern):
+        """
+        True if a complete pattern meets every constraint.
+        """
+        return self.min_length <= len(pattern) \
+            and (self.max_length is None or len(pattern) <= self.max_length) \
+            and self.satisfied_by(pattern)
 
 #class for the FP Tree
 class DominantTree():
     """
     A frequent pattern tree.
     """
-    def __init__(self, transactions, threshold, root_value, root_count):
+    def __init__(self, transactions, threshold, root_value, root_count, weighted=False,
+                 constraints=None, budget=None, prune=False):
         """
-        Initialize the tree.
+        Initialize the tree. With weighted=True, transactions are
+        (transaction, count) pairs. prune=True runs tree_pruning after the build.
         """
+        if not weighted:
+            transactions = weighted_transactions(transactions)
+        self._setup(() if root_value is None else (root_value,), threshold, constraints, budget,
+                    prune=prune)
         self.frequent = self.find_frequent_items(transactions, threshold)
+        for item in self.constraints.exclude:
+            self.frequent.pop(item, None)
+        self.root = self.createTree(transactions, root_value, root_count, self.frequent, self.headers)
+
+    def _setup(self, suffix, threshold, constraints=None, budget=None, pairs=None, prune=False):
+        """
+        Set the attributes every way of building a tree starts from.
+        """
+        self.constraints = constraints or PatternConstraints()
+        self.budget = budget
+        self.pairs = pairs
+        self.suffix = suffix
+        self.threshold = threshold
+        self.prune = prune
+        self.pruning = None
+        self.frequent = {}
         self.itemTable = {}
-        self.headers = {}
+        self.headers = HeaderTable()
+        self.bases = {}
         self.buffer = []
         self.maxBufferLength = 100
         self.maxResursionCall = 50
-        self.root = self.createTree(transactions, root_value, root_count, self.frequent, self.headers)
+        self.root = None
 
-    @staticmethod
-    def find_frequent_items(transactions, threshold):
+    @classmethod
+    def conditional(cls, paths, threshold, root_value, root_count, suffix=None, constraints=None,
+                    budget=None, pairs=None):
         """
-        Create a dictionary of items with occurrences above the threshold.
+        Build a conditional tree from weighted prefix paths, inserted under
+        one fixed item order (descending support in the pattern base).
         """
-        items = {}
+        tree = cls.__new__(cls)
+        tree._setup(suffix if suffix is not None else (root_value,), threshold, constraints, budget,
+                    pairs)
+        tree.frequent = tree.find_frequent_items(paths, threshold)
+        tree.root = treeNode(root_value, root_count, None)
+
+        frequent = tree.frequent
+        rank = {item: r for r, item in enumerate(sorted(frequent, key=frequent.get, reverse=True))}
+        for path, count in paths:
+            items = [x for x in path if x in rank]
+            if items:
+                items.sort(key=rank.__getitem__)
+                insert_transaction(tree.root, items, count, tree.headers)
+
+        return tree
+
+    @classmethod
+    def parallel(cls, dataset, threshold, workers, weighted=False, constraints=None, budget=None,
+                 order=None):
+        """
+        Build the top-level tree with a process pool, under one global item
+        order (descending support, or order when given). dataset is a list of
+        transactions or the path of a .dat file.
+        """
+        tree = cls.__new__(cls)
+        tree._setup((), threshold, constraints, budget)
+        tree.root = treeNode(None, None, None)
+
+        if isinstance(dataset, str):
+            parts = [(dataset, start, end) for start, end in split_byte_ranges(dataset, workers)]
+            items = Counter()
+            for counts in run_tasks(_count_items, parts, workers):
+                items.update(counts)
+            tree.frequent = {item: count for item, count in items.items() if count >= threshold}
+        else:
+            if not weighted:
+                dataset = weighted_transactions(dataset)
+            step = max(1, -(-len(dataset) // max(1, workers)))
+            parts = [dataset[i:i + step] for i in range(0, len(dataset), step)]
+            tree.frequent = tree.find_frequent_items(dataset, threshold)
+        for item in tree.constraints.exclude:
+            tree.frequent.pop(item, None)
+
+        frequent = tree.frequent
+        if order is None:
+            order = sorted(frequent, key=lambda item: (-frequent[item], item))
+        else:
+            order = [item for item in order if item in frequent]
+        rank = {item: r for r, item in enumerate(order)}
+        if len(parts) == 1 and not isinstance(parts[0], tuple):
+            # In one process the tree is built in place.
+            _insert_ranked(tree.root, parts[0], rank, tree.headers)
+            return tree
+        for flat in run_tasks(_build_partial, [(part, rank) for part in parts], workers):
+            if budget is not None:
+                budget.check()
+            merge_flat_tree(tree.root, flat, tree.headers)
+
+        return tree
+
+    @classmethod
+    def incremental(cls, constraints=None, budget=None):
+        """
+        Create an empty tree that grows with insert_batch. Every item is
+        kept and transactions are inserted in sorted item order.
+        """
+        tree = cls.__new__(cls)
+        tree._setup((), None, constraints, budget)
+        tree.root = treeNode(None, None, None)
+        return tree
 
-        for transaction in transactions:
-            for item in transaction:
-                if item in items:
-                    items[item] += 1
-                else:
-                    items[item] = 1
+    def insert_batch(self, transactions, weighted=False):
+        """
+        Add transactions to a tree made by incremental.
+        """
+        if not weighted:
+            transactions = weighted_transactions(transactions)
+        table = self.itemTable
+        exclude = self.constraints.exclude
+        for transaction, count in transactions:
+            items = sorted(set(transaction).difference(exclude))
+            if items:
+                for item in items:
+                    table[item] = table.get(item, 0) + count
+                insert_transaction(self.root, items, count, self.headers)
+
+    def snapshot(self):
+        """
+        A picklable copy of the tree, for from_snapshot: its nodes, the
+        order of the nodes in the header table, the item supports and the
+        bases kept by tree_pruning.
+        """
+        nodes = []
+        flat = flatten_tree(self.root, nodes)
+        position = {id(node): i for i, node in enumerate(nodes)}
+        headers = {item: [position[id(node)] for node in linked]
+                   for item, linked in self.headers.items()}
+        return flat, headers, dict(self.itemTable), dict(self.frequent), self.bases
+
+    @classmethod
+    def from_snapshot(cls, snapshot, constraints=None, budget=None):
+        """
+        Rebuild a tree from snapshot, e.g. in another process or from a
+        checkpoint. The copy mines exactly like the original. Only trees
+        made by incremental may be grown further with insert_batch.
+        """
+        flat, headers, item_table, frequent, bases = snapshot
+        tree = cls.incremental(constraints, budget)
+        nodes = merge_flat_tree(tree.root, flat, tree.headers)
+        for item, positions in headers.items():
+            tree.headers[item] = [nodes[i] for i in positions]
+        tree.itemTable = dict(item_table)
+        tree.frequent = dict(frequent)
+        tree.bases = bases
+        return tree
+
+    def mine_incremental(self, threshold):
+        """
+        Mine an incremental tree at the given absolute threshold.
+        """
+        self.threshold = threshold
+        self.frequent = {item: count for item, count in self.itemTable.items() if count >= threshold}
+        return self.mine_patterns(threshold)
 
-        #print (items)
-        for key in list(items.keys()):
-            if items[key] < threshold:
-                del items[key]
-        
-        #print (items)
-        return items
+    find_frequent_items = staticmethod(find_frequent_items)
     
-    def createInitSet(self,dataSet):
+    def createInitSet(self, dataSet, frequent):
+        """
+        Collapse the weighted transactions into frequent itemset -> count.
+        """
         retDict = {}
-        for trans in dataSet:
-            if frozenset(trans) in retDict:
-                retDict[frozenset(trans)] += 1
+        for trans, count in dataSet:
+            key = frozenset(x for x in trans if x in frequent)
+            if not key:
+                continue
+            if key in retDict:
+                retDict[key] += count
             else:
-                retDict[frozenset(trans)] = 1
+                retDict[key] = count
             
         return retDict
 
@@ -75,16 +239,7 @@ class DominantTree():
        
         retTree = treeNode(root_value, root_count, None) 
         
-        new_records = []
-        
-        for transaction in dataSet:
-            sorted_items = [x for x in transaction if x in frequent]
-
-            sorted_items.sort(key=lambda x: frequent[x], reverse=True)
-
-            new_records.append(sorted_items)
-            
-        dataSet = self.createInitSet(new_records) #initSet
+        dataSet = self.createInitSet(dataSet, frequent) #initSet
         
         for tranSet, count in dataSet.items():  
             
@@ -111,13 +266,91 @@ class DominantTree():
             if len(self.buffer) > self.maxBufferLength:
             
                 self.bufferHandler(retTree)
+
+            # The budget also covers the build.
+            if self.budget is not None:
+                self.budget.check()
                 
         if len(self.buffer) > 0:
             self.bufferHandler(retTree)
         
-        #retTree.tree_pruning (self.threshold)
+        if self.prune:
+            retTree = self.tree_pruning(retTree, self.threshold)
        
         return retTree
+
+    def tree_pruning(self, root, threshold):
+        """
+        Splice out the nodes of items that cannot reach threshold in any
+        conditional tree; their own pattern bases go to self.bases.
+        """
+        headers = self.headers
+        through = {}
+        upward = {}
+        before = 0
+        for item, nodes in headers.items():
+            before += len(nodes)
+            through[item] = sum(child.count for node in nodes for child in node.children.values())
+            upward[item] = sum(node.count for node in nodes if node.parent is not root)
+        # An item only survives in a pattern base below it with the counts
+        # flowing from its nodes into their children.
+        spliced = {item for item, count in through.items() if count < threshold}
+
+        self.pruning = {"Nodes Before": before, "Nodes After": before, "Spliced Items": len(spliced)}
+        if not spliced:
+            return root
+
+        # Every spliced item gets an entry, even an empty one, so the tree
+        # left behind is never mined as a single path of all frequent items.
+        for item in spliced:
+            self.bases[item] = []
+            if upward[item] >= threshold:
+                self.bases[item] = [([x for x in prefix_path(node) if x not in spliced], node.count)
+                                    for node in headers[item]]
+
+        headers.clear()
+        stack = [root]
+        while stack:
+            parent = stack.pop()
+            children = parent.children
+            pending = [child for child in children.values() if child.name in spliced]
+            while pending:
+                node = pending.pop()
+                del children[node.name]
+                for child in node.children.values():
+                    merged = self.merge_node(parent, child)
+                    if merged is child and child.name in spliced:
+                        pending.append(child)
+            for child in children.values():
+                headers.link(child)
+                stack.append(child)
+
+        self.pruning["Nodes After"] = sum(len(nodes) for nodes in headers.values())
+        return root
+
+    def merge_node(self, parent, node):
+        """
+        Attach node below parent, merging it into an existing child of the
+        same item: counts are summed and children merged recursively.
+        Returns the node that now holds the item below parent.
+        """
+        existing = parent.children.get(node.name)
+        if existing is None:
+            parent.children[node.name] = node
+            node.parent = parent
+            return node
+        stack = [(existing, node)]
+        while stack:
+            target, source = stack.pop()
+            target.count += source.count
+            for child in source.children.values():
+                match = target.children.get(child.name)
+                if match is None:
+                    target.children[child.name] = child
+                    child.parent = target
+                else:
+                    stack.append((match, child))
+        return existing
     
     def getFromTable (self, items):
         itemsAndCounts = {}
@@ -221,35 +454,36 @@ class DominantTree():
     def update_header_table (self, nodes):
         # add in header structure
         for node in nodes:
-            if node.name in self.headers.keys():
-                self.headers[node.name].append(node)
-            else:
-                self.headers[node.name] = [node]
+            self.headers.link(node)
     
     #pattern mining begins...            
-    def mine_patterns(self, threshold):
+    def mine_patterns(self, threshold, threads=1):
         """
-        Mine the constructed FP tree for frequent patterns.
+        Mine the constructed FP tree for frequent patterns. With threads > 1
+        the conditional trees of the items are mined by a thread pool (see
+        mine_sub_trees).
         """
-        if self.tree_has_single_path(self.root):
+        # Spliced items are no longer in the tree, though still frequent.
+        if not self.bases and self.tree_has_single_path(self.root):
             #print ("True")
             return self.generate_pattern_list()
         else:
             #print ("+True")
-            return self.zip_patterns(self.mine_sub_trees(threshold))
+            patterns = self.zip_patterns(self.mine_sub_trees(threshold, threads))
+            # In a conditional tree the suffix is a pattern on its own,
+            # as in generate_pattern_list.
+            if self.root.name is not None and self.constraints.accepts(self.suffix):
+                patterns[(self.root.name,)] = self.root.count
+                if self.budget is not None:
+                    self.budget.add(1)
+            return patterns
         
     def tree_has_single_path(self, node):
         """
         If there is a single path in the tree,
         return True, else return False.
         """
-        num_children = len(node.children)
-        if num_children > 1:
-            return False
-        elif num_children == 0:
-            return True
-        else:
-            return True and self.tree_has_single_path(list(node.children.values())[0])
+        return tree_has_single_path(node)
         
     def generate_pattern_list(self):
         """
@@ -257,6 +491,9 @@ class DominantTree():
         """
         patterns = {}
         items = self.frequent.keys()
+        constraints = self.constraints
+        suffix_length = len(self.suffix)
+        has_required = constraints.satisfied_by(self.suffix)
 
         # If we are in a conditional tree,
         # the suffix is a pattern on its own.
@@ -264,15 +501,76 @@ class DominantTree():
             suffix_value = []
         else:
             suffix_value = [self.root.name]
-            patterns[tuple(suffix_value)] = self.root.count
+            if constraints.accepts(self.suffix):
+                patterns[tuple(suffix_value)] = self.root.count
+
+        # Only the subset sizes that give patterns of an allowed length.
+        first = max(1, constraints.min_length - suffix_length)
+        last = len(items)
+        if constraints.max_length is not None:
+            last = min(last, constraints.max_length - suffix_length)
 
-        for i in range(1, len(items) + 1):
+        for i in range(first, last + 1):
             for subset in itertools.combinations(items, i):
+                if not has_required and constraints.must_include.isdisjoint(subset):
+                    continue
                 pattern = tuple(sorted(list(subset) + suffix_value))
                 patterns[pattern] = \
                     min([self.frequent[x] for x in subset])
+                # Long single paths explode combinatorially, so the budget
+                # is also checked while they are enumerated.
+                if self.budget is not None and len(patterns) % 4096 == 0:
+                    self.budget.add(4096)
 
+        if self.budget is not None:
+            self.budget.add(len(patterns) % 4096)
         return patterns
+
+    def count_patterns(self, threshold):
+        """
+        Count-only mine_patterns: a Counter of pattern lengths. Only valid
+        when no pattern is reached from two items (fixed-order trees).
+        """
+        if not self.bases and self.tree_has_single_path(self.root):
+            return self.count_pattern_list()
+        counts = Counter()
+        for item, item_counts in self.mine_items(
+                sorted(self.frequent, key=self.frequent.get), threshold, count=True):
+            counts.update(item_counts)
+        if self.root.name is not None and self.constraints.accepts(self.suffix):
+            counts[len(self.suffix)] += 1
+            if self.budget is not None:
+                self.budget.add(1)
+        return counts
+
+    def count_pattern_list(self):
+        """
+        Count-only generate_pattern_list, with the subset counts in closed
+        form.
+        """
+        counts = Counter()
+        constraints = self.constraints
+        suffix_length = len(self.suffix)
+        items = self.frequent.keys()
+        if self.root.name is not None and constraints.accepts(self.suffix):
+            counts[suffix_length] = 1
+
+        has_required = constraints.satisfied_by(self.suffix)
+        required = len(constraints.must_include.intersection(items))
+        first = max(1, constraints.min_length - suffix_length)
+        last = len(items)
+        if constraints.max_length is not None:
+            last = min(last, constraints.max_length - suffix_length)
+
+        for i in range(first, last + 1):
+            number = math.comb(len(items), i)
+            if not has_required:
+                number -= math.comb(len(items) - required, i)
+            if number:
+                counts[suffix_length + i] = number
+        if self.budget is not None:
+            self.budget.add(sum(counts.values()))
+        return counts
     
     def zip_patterns(self, patterns):
        
@@ -288,43 +586,131 @@ class DominantTree():
 
         return patterns
     
-    def mine_sub_trees(self, threshold):
-        
+    def mine_sub_trees(self, threshold, threads=1):
+        """
+        Mine the conditional tree of every item and sum the patterns, with a
+        thread pool when threads > 1.
+        """
         patterns = {}
         mining_order = sorted(self.frequent.keys(),
                               key=lambda x: self.frequent[x])
-        
+
+        # Mining only reads the tree, so the threads share it unpickled.
+        if threads > 1:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                results = list(executor.map(self._mine_item, mining_order,
+                                            itertools.repeat(threshold)))
+        else:
+            results = self.mine_items(mining_order, threshold)
+
+        for item, subtree_patterns in results:
+            # Insert subtree patterns into main patterns dictionary.
+            for pattern in subtree_patterns.keys():
+                if pattern in patterns:
+                    patterns[pattern] += subtree_patterns[pattern]
+                else:
+                    patterns[pattern] = subtree_patterns[pattern]
+
+        return patterns
+
+    def _mine_item(self, item, threshold):
+        return next(self.mine_items([item], threshold))
+
+    def mine_items(self, mining_order, threshold, count=False):
+        """
+        Mine the conditional tree of every item in mining_order, in that
+        order, and yield (item, patterns) as each one is completed. With
+        count=True the patterns are only counted, and a Counter of pattern
+        lengths is yielded instead (see count_patterns).
+        """
+        constraints = self.constraints
+        partners = None if self.pairs is None else self.pairs.partners(threshold)
+
         for item in mining_order:
+            if self.budget is not None:
+                self.budget.check()
+            item_suffix = self.suffix + (item,)
+
+            # Items of the base must pair frequently with every suffix item.
+            allowed = None
+            if partners is not None:
+                allowed = set.intersection(*(partners[x] for x in item_suffix))
+
+            # At the length cap, or when nothing can extend it, the suffix
+            # itself is the only pattern left.
+            if (constraints.max_length is not None and len(item_suffix) >= constraints.max_length) \
+                    or allowed is not None and not allowed:
+                if constraints.accepts(item_suffix):
+                    if self.budget is not None:
+                        self.budget.add(1)
+                    yield item, Counter({len(item_suffix): 1}) if count else {(item,): self.frequent[item]}
+                else:
+                    yield item, Counter() if count else {}
+                continue
+
             suffixes = []
             conditional_tree_input = []
             
-            suffixes = self.headers[item]
+            suffixes = self.headers.get(item, [])
             
             for suffix in suffixes:
                 frequency = suffix.count
-                path = []
-                parent = suffix.parent
-
-                while parent.parent is not None:
-                    path.append(parent.name)
-                    parent = parent.parent
+                path = cached_prefix_path(suffix)
+                if allowed is not None:
+                    path = [x for x in path if x in allowed]
                 
-                for i in range(frequency):
-                    conditional_tree_input.append(path)
-
-            subtree = DominantTree(conditional_tree_input, threshold,
-                             item, self.frequent[item])
+                conditional_tree_input.append((path, frequency))
+
+            # Pattern bases set aside by tree_pruning.
+            for path, frequency in self.bases.get(item, ()):
+                if allowed is not None:
+                    path = [x for x in path if x in allowed]
+                conditional_tree_input.append((path, frequency))
+
+            # Skip branches that can never reach a required item.
+            if not constraints.satisfied_by(item_suffix) and not any(
+                    not constraints.must_include.isdisjoint(path) for path, _ in conditional_tree_input):
+                yield item, Counter() if count else {}
+                continue
+
+            subtree = DominantTree.conditional(conditional_tree_input, threshold,
+                                               item, self.frequent[item],
+                                               item_suffix, constraints, self.budget, self.pairs)
             #subtree.root.disp()
-            subtree_patterns = subtree.mine_patterns(threshold)
+            if count:
+                yield item, subtree.count_patterns(threshold)
+            else:
+                yield item, subtree.mine_patterns(threshold)
 
-            # Insert subtree patterns into main patterns dictionary.
-            for pattern in subtree_patterns.keys():
-                if pattern in patterns:
-                    patterns[pattern] += subtree_patterns[pattern]
-                else:
-                    patterns[pattern] = subtree_patterns[pattern]
+def _count_items(part):
+    """
+    Item supports of one byte range of a .dat file.
+    """
+    counts = Counter()
+    for transaction in iter_transactions(*part):
+        counts.update(set(transaction))
+    return counts
 
-        return patterns
+def _build_partial(args):
+    """
+    Build the tree of one share of the transactions under a global item
+    order and return it flattened for the trip back to the parent.
+    """
+    part, rank = args
+    if isinstance(part, tuple):
+        part = load_weighted_transactions(*part)
+    root = treeNode(None, None, None)
+    _insert_ranked(root, part, rank, HeaderTable())
+    return flatten_tree(root)
+
+def _insert_ranked(root, part, rank, headers):
+    """
+    Insert weighted transactions under the item order given by rank.
+    """
+    for transaction, count in part:
+        items = sorted({x for x in transaction if x in rank}, key=rank.__getitem__)
+        if items:
+            insert_transaction(root, items, count, headers)
 
 #collecting initial time and memory space
 def get_process_memory():
@@ -332,16 +718,179 @@ def get_process_memory():
     return process.memory_info().rss
 
 #finding the frequent patterns
-def find_frequent_patterns(transactions, support_threshold):
+def find_frequent_patterns(transactions, support_threshold, weighted=False,
+                           max_length=None, min_length=1, must_include=None, exclude=None,
+                           workers=1, pair_counts=False, hash_buckets=None, prune=False,
+                           threads=1):
     '''
     Using a set a trasnactions to find patterns in it over 
-    the specified support threshold.
+    the specified support threshold. With weighted=True, transactions are
+    (transaction, count) pairs, e.g. from load_weighted_transactions.
+    max_length, min_length, must_include and exclude constrain the patterns.
+    workers > 1 builds the tree with DominantTree.parallel (transactions may
+    then be a .dat path); that fixed-order build finds every frequent pattern,
+    which can be more than the default build finds.
+    pair_counts=True prunes pattern bases with exact pair counts, and
+    hash_buckets runs the PCY/DHP hash_pair_filter first.
+    prune=True shrinks the tree before mining and threads > 1 mines the items
+    in a thread pool; neither changes the patterns.
     '''
-    tree = DominantTree(transactions, support_threshold, None, None)
-    pattern = tree.mine_patterns(support_threshold)
+    constraints = PatternConstraints(max_length, min_length, must_include, exclude)
+    singles = None
+    if hash_buckets:
+        if isinstance(transactions, str):
+            transactions = load_weighted_transactions(transactions)
+        elif not weighted:
+            transactions = weighted_transactions(transactions)
+        singles, transactions = hash_pair_filter(transactions, support_threshold, hash_buckets)
+        weighted = True
+        singles = {(item,): count for item, count in singles.items()
+                   if item not in constraints.exclude and constraints.accepts((item,))}
+    if workers > 1:
+        tree = DominantTree.parallel(transactions, support_threshold, workers, weighted, constraints)
+    else:
+        tree = DominantTree(transactions, support_threshold, None, None, weighted, constraints,
+                            prune=prune)
+    if pair_counts:
+        if isinstance(transactions, str):
+            source = ((transaction, 1) for transaction in iter_transactions(transactions))
+        else:
+            source = transactions if weighted else weighted_transactions(transactions)
+        tree.pairs = PairCounts(source, tree.frequent)
+        if max_length is not None and max_length <= 2:
+            candidates = {(item,): count for item, count in tree.frequent.items()}
+            candidates.update(tree.pairs.frequent_pairs(support_threshold))
+            pattern = {k: v for k, v in candidates.items() if constraints.accepts(k)}
+            if singles is not None:
+                pattern.update(singles)
+            return pattern
+    pattern = tree.mine_patterns(support_threshold, threads)
+    if singles is not None:
+        # Trimming lowers the supports of single items in the tree.
+        pattern.update(singles)
     #print("Frequent Patterns: ", pattern)
     return pattern
 
+def find_frequent_patterns_budgeted(transactions, support_threshold, time_budget=None,
+                                    max_patterns=None, weighted=False, max_length=None,
+                                    min_length=1, must_include=None, exclude=None):
+    '''
+    Anytime find_frequent_patterns: mining stops after time_budget seconds
+    or max_patterns patterns. Returns (patterns, report); only patterns whose
+    items were all mined are returned.
+    '''
+    budget = MiningBudget(time_budget, max_patterns)
+    constraints = PatternConstraints(max_length, min_length, must_include, exclude)
+    patterns = {}
+    completed = []
+    mining_order = []
+    reason = None
+
+    try:
+        tree = DominantTree(transactions, support_threshold, None, None, weighted,
+                            constraints, budget)
+        mining_order = sorted(tree.frequent.keys(),
+                              key=lambda x: tree.frequent[x], reverse=True)
+        if tree.tree_has_single_path(tree.root):
+            patterns = tree.generate_pattern_list()
+            completed = mining_order
+        else:
+            for item, subtree_patterns in tree.mine_items(mining_order, support_threshold):
+                for pattern, support in subtree_patterns.items():
+                    patterns[pattern] = patterns.get(pattern, 0) + support
+                completed.append(item)
+    except BudgetExceeded as e:
+        reason = e.reason
+
+    done = set(completed)
+    patterns = {k: v for k, v in patterns.items() if done.issuperset(k)}
+    pending = [item for item in mining_order if item not in done]
+    return patterns, budget.report(reason, completed, pending)
+
+def find_frequent_patterns_checkpointed(transactions, support_threshold, checkpoint_dir,
+                                        resume=True, weighted=False, max_length=None,
+                                        min_length=1, must_include=None, exclude=None,
+                                        prune=False):
+    '''
+    find_frequent_patterns that saves its tree and every completed item in
+    checkpoint_dir, and resumes from there when rerun.
+    '''
+    constraints = PatternConstraints(max_length, min_length, must_include, exclude)
+    key = json.dumps([dataset_fingerprint(transactions), support_threshold, weighted, max_length,
+                      min_length, sorted(constraints.must_include, key=str),
+                      sorted(constraints.exclude, key=str), prune], default=str)
+    checkpoint = MiningCheckpoint(checkpoint_dir, key, resume)
+
+    snapshot = checkpoint.load_tree()
+    if snapshot is None:
+        if isinstance(transactions, str):
+            transactions = load_weighted_transactions(transactions)
+            weighted = True
+        tree = DominantTree(transactions, support_threshold, None, None, weighted, constraints,
+                            prune=prune)
+        checkpoint.save_tree(tree.snapshot())
+    else:
+        tree = DominantTree.from_snapshot(snapshot, constraints)
+
+    if not tree.bases and tree.tree_has_single_path(tree.root):
+        return tree.generate_pattern_list()
+
+    patterns = {}
+    done = set()
+    for item, subtree_patterns in checkpoint.completed():
+        done.add(item)
+        for pattern, support in subtree_patterns.items():
+            patterns[pattern] = patterns.get(pattern, 0) + support
+    mining_order = [x for x in sorted(tree.frequent.keys(), key=lambda x: tree.frequent[x])
+                    if x not in done]
+    for item, subtree_patterns in tree.mine_items(mining_order, support_threshold):
+        checkpoint.add(item, subtree_patterns)
+        for pattern, support in subtree_patterns.items():
+            patterns[pattern] = patterns.get(pattern, 0) + support
+    return patterns
+
+def count_frequent_patterns(transactions, support_threshold, weighted=False, max_length=None,
+                            min_length=1, must_include=None, exclude=None, budget=None):
+    '''
+    Count the frequent patterns per pattern length without building them,
+    on a fixed-order tree. Returns a dict length -> count.
+    '''
+    constraints = PatternConstraints(max_length, min_length, must_include, exclude)
+    tree = DominantTree.parallel(transactions, support_threshold, 1, weighted, constraints, budget)
+    return dict(sorted(tree.count_patterns(support_threshold).items()))
+
+def find_support_for_count(transactions, target_patterns, weighted=False, tolerance=0.01,
+                           max_length=None, min_length=1, must_include=None, exclude=None):
+    '''
+    Lowest support threshold yielding at most target_patterns patterns,
+    found by bisection with count_frequent_patterns. Returns the threshold
+    and its counts.
+    '''
+    if isinstance(transactions, str):
+        transactions = load_weighted_transactions(transactions)
+    elif not weighted:
+        transactions = weighted_transactions(transactions)
+
+    def counts_at(threshold):
+        try:
+            return count_frequent_patterns(transactions, threshold, True, max_length, min_length,
+                                           must_include, exclude,
+                                           MiningBudget(max_patterns=target_patterns + 1))
+        except BudgetExceeded:
+            return None
+
+    # The answer lies in (low, high]; the total count always qualifies.
+    low, high = 0, sum(count for _, count in transactions)
+    best = counts_at(high)
+    while high - low > max(1, high * tolerance):
+        middle = (low + high) // 2
+        counts = counts_at(middle)
+        if counts is None:
+            low = middle
+        else:
+            high, best = middle, counts
+    return high, best
+
 def generate_association_rules(patterns, confidence_threshold):
 
     rules = {}
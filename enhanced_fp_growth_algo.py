@@ -1,104 +1,40 @@
 import itertools
 
+from tree_core import (TreeNode, HeaderTable, cached_prefix_path, find_frequent_items,
+                       insert_transaction, tree_has_single_path, weighted_transactions)
 
-class FPNode(object):
-    """
-    A node in the FP tree.
-    """
-
-    def __init__(self, value, count, parent):
-        """
-        Create the node.
-        """
-        self.value = value
-        self.count = count
-        self.parent = parent
-        #self.link = None
-        self.children = []
-
-    def has_child(self, value):
-        """
-        Check if node has a particular child node.
-        """
-        for node in self.children:
-            if node.value == value:
-                return True
+# Nodes come from the shared tree core: children are hashed by item.
+FPNode = TreeNode
 
-        return False
-
-    def get_child(self, value):
-        """
-        Return a child node with a particular value.
-        """
-        for node in self.children:
-            if node.value == value:
-                return node
-
-        return None
-
-    def add_child(self, value):
-        """
-        Add a node as a child node.
-        """
-        child = FPNode(value, 1, self)
-        self.children.append(child)
-        return child
-    
-    def disp(self, ind=1):
-        print ('  '*ind, self.value, ' ', self.count)
-        for child in self.children:
-            child.disp(ind+1)  
 
 class FPTree(object):
     """
     A frequent pattern tree.
     """
 
-    def __init__(self, transactions, threshold, root_value, root_count):
+    def __init__(self, transactions, threshold, root_value, root_count, weighted=False):
         """
-        Initialize the tree.
+        Initialize the tree. With weighted=True, transactions are
+        (transaction, count) pairs.
         """
+        if not weighted:
+            transactions = weighted_transactions(transactions)
         self.frequent = self.find_frequent_items(transactions, threshold)
         #print (self.frequent)
-        #self.linkTable = self.build_header_table(self.frequent)
         self.linkTable = self.build_header_table(self.frequent)
         #print (self.linkTable)
         self.root = self.build_fptree(
             transactions, root_value,
             root_count, self.frequent, self.linkTable)
 
-    @staticmethod
-    def find_frequent_items(transactions, threshold):
-        """
-        Create a dictionary of items with occurrences above the threshold.
-        """
-        items = {}
-
-        for transaction in transactions:
-            for item in transaction:
-                if item in items:
-                    items[item] += 1
-                else:
-                    items[item] = 1
-
-        #print (items)
-        for key in list(items.keys()):
-            if items[key] < threshold:
-                del items[key]
-        
-        #print (items)
-        return items
+    find_frequent_items = staticmethod(find_frequent_items)
 
     @staticmethod
     def build_header_table(frequent):
         """
         Build the header table.
         """
-        linkTable = {}
-        for key in frequent.keys():
-            linkTable[key] = None
-
-        return linkTable
+        return HeaderTable()
 
     def build_fptree(self, transactions, root_value,
                      root_count, frequent, linkTable):
@@ -107,55 +43,25 @@ class FPTree(object):
         """
         root = FPNode(root_value, root_count, None)
 
-        for transaction in transactions:
+        for transaction, count in transactions:
             sorted_items = [x for x in transaction if x in frequent]
             sorted_items.sort(key=lambda x: frequent[x], reverse=True)
             if len(sorted_items) > 0:
-                self.insert_tree(sorted_items, root, linkTable)
+                self.insert_tree(sorted_items, root, linkTable, count)
         return root
 
-    def insert_tree(self, items, node, linkTable):
+    def insert_tree(self, items, node, linkTable, count=1):
         """
-        Recursively grow FP tree.
+        Grow FP tree along items, linking new nodes to the header structure.
         """
-        #print (items)
-        first = items[0]
-        child = node.get_child(first)
-        if child is not None:
-            child.count += 1
-        else:
-            # Add new child.
-            child = node.add_child(first)
-
-            # Link it to header structure.
-            if linkTable[first] is None:
-                linkTable[first] = [child]
-            else:
-                #print ("++" + str(linkTable[first].value))
-                #current = linkTable[first]
-                #print (current.value)
-                #while current.link is not None:
-                #    current = current.link
-                #current.link = child
-                linkTable[first].append(child)
-                    
-        # Call function recursively.
-        remaining_items = items[1:]
-        if len(remaining_items) > 0:
-            self.insert_tree(remaining_items, child, linkTable)
+        insert_transaction(node, items, count, linkTable)
 
     def tree_has_single_path(self, node):
         """
         If there is a single path in the tree,
         return True, else return False.
         """
-        num_children = len(node.children)
-        if num_children > 1:
-            return False
-        elif num_children == 0:
-            return True
-        else:
-            return True and self.tree_has_single_path(node.children[0])
+        return tree_has_single_path(node)
 
     def mine_patterns(self, threshold):
         """
@@ -220,43 +126,27 @@ class FPTree(object):
 
         # Get items in tree in reverse order of occurrences.
         for item in mining_order:
-            suffixes = []
             conditional_tree_input = []
-            
-            '''
-            node = self.linkTable[item]
-
-            # Follow node links to get a list of
-            # all occurrences of a certain item.
-            while node is not None:
-                suffixes.append(node)
-                node = node.link
-            '''
-            
-            suffixes = self.linkTable[item]
-            
+
+            # The header table lists all occurrences of a certain item.
+            suffixes = self.linkTable.get(item, [])
+
             # For each occurrence of the item, 
             # trace the path back to the root node.
             for suffix in suffixes:
                 frequency = suffix.count
-                path = []
-                parent = suffix.parent
-
-                while parent.parent is not None:
-                    path.append(parent.value)
-                    parent = parent.parent
+                path = cached_prefix_path(suffix)
                 
                 #print (path)
                 
-                for i in range(frequency):
-                    conditional_tree_input.append(path)
+                conditional_tree_input.append((path, frequency))
                     
                 #print (conditional_tree_input)
 
             # Now we have the input for a subtree,
             # so construct it and grab the patterns.
             subtree = FPTree(conditional_tree_input, threshold,
-                             item, self.frequent[item])
+                             item, self.frequent[item], weighted=True)
             #subtree.root.disp()
             subtree_patterns = subtree.mine_patterns(threshold)
 
@@ -270,12 +160,13 @@ class FPTree(object):
         return patterns
 
 
-def find_frequent_patterns(transactions, support_threshold):
+def find_frequent_patterns(transactions, support_threshold, weighted=False):
     """
     Given a set of transactions, find the patterns in it
-    over the specified support threshold.
+    over the specified support threshold. With weighted=True, transactions
+    are (transaction, count) pairs, e.g. from load_weighted_transactions.
     """
-    tree = FPTree(transactions, support_threshold, None, None)
+    tree = FPTree(transactions, support_threshold, None, None, weighted)
     return tree.mine_patterns(support_threshold)
 
 
@@ -1,145 +1,301 @@
 #import math
 #import csv
 #import sys
+import heapq
 import itertools
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from mining_budget import BudgetExceeded, MiningBudget
 #import time
 #import os
 #import psutil
 #import csv
 #import gc
 
-def find_frequent_patterns(datalist, minSupport):
+class HStruct():
+    """
+    The H-struct of a dataset.
+
+    Frequent items are encoded as integer ranks in ascending order of
+    support. The frequent projection of every transaction is stored in one
+    contiguous integer array (cell), sorted by rank and terminated by a
+    negative separator. Duplicate projections are stored once: the
+    separator of the j-th projection is -1 - j, and weights[j] holds the
+    number of transactions sharing it (weights is None when every
+    projection is unique). ends[p] is the position of the separator closing
+    the projection of cell[p].
+    The H-struct is read-only once built, so it can be shared by any number
+    of work units and worker processes.
+    """
+    def __init__(self, datalist, minSupport, weighted=False):
+        # With weighted=True, datalist holds (transaction, count) pairs.
+        self.minSupport = minSupport
+
+        #Building mapItemToSupport Dictionary with Unique Items in input dataset and it's support value
+        mapItemToSupport = Counter()
+        if weighted:
+            for tran, count in datalist:
+                for item in set(tran):
+                    mapItemToSupport[item] += count
+        else:
+            for tran in datalist:
+                mapItemToSupport.update(set(tran))
+
+        # f-list of frequent items in ascending order of support
+        self.flist = [item for item, support in mapItemToSupport.items() if support >= minSupport]
+        self.flist.sort(key=lambda x: mapItemToSupport[x])
+        rank = {item: r for r, item in enumerate(self.flist)}
+
+        # Collapsing the transactions with the same frequent projection, keyed by its packed ranks
+        projections = {}
+        for tran, count in (datalist if weighted else ((tran, 1) for tran in datalist)):
+            temp = sorted({rank[item] for item in tran if item in rank})
+            if temp:
+                key = array('i', temp).tobytes()
+                projections[key] = projections.get(key, 0) + count
+
+        #This variable stores all the frequent projections in all the transactions seperated by -1 - j
+        cell = array('i')
+        for j, key in enumerate(projections):
+            cell.frombytes(key)
+            cell.append(-1 - j)
+        self.cell = np.frombuffer(cell, dtype=np.intc).astype(np.int32)
+        self.weights = None
+        if projections and max(projections.values()) > 1:
+            self.weights = np.fromiter(projections.values(), dtype=np.int64, count=len(projections))
+        del projections, cell
+
+        separators = np.flatnonzero(self.cell < 0).astype(np.int32)
+        self.transactionCount = len(separators)
+        self.ends = np.repeat(separators, np.diff(separators, prepend=-1))
+
+    def cell_weights(self, positions):
+        """
+        Weights of the projections holding the cells at positions.
+        """
+        return self.weights[-1 - self.cell[self.ends[positions]]]
+
+    def root_units(self):
+        """
+        Return one work unit per frequent item.
+
+        A work unit is (prefix, item, support, hyperlinks): the ranks already
+        in the pattern, the item extending it, its support and the positions
+        of the item in the cell store. Units are independent of each other
+        and can be mined in any order or process.
+        """
+        # Positions grouped by item; the separators sort first and are skipped.
+        links = np.argsort(self.cell, kind='stable')[self.transactionCount:].astype(np.int32)
+        occurrences = np.bincount(self.cell[links], minlength=len(self.flist))
+        supports = occurrences
+        if self.weights is not None:
+            supports = np.bincount(self.cell[links], weights=self.cell_weights(links),
+                                   minlength=len(self.flist))
+        starts = np.cumsum(occurrences) - occurrences
+        return [((), r, int(supports[r]), links[starts[r]:starts[r] + occurrences[r]])
+                for r in range(len(self.flist))]
+
+    def projected_size(self, pointers):
+        """
+        Number of cells in the projected database of a hyperlink queue.
+        """
+        return int((self.ends[pointers] - pointers - 1).sum())
+
+    def project(self, pointers, queue=None):
+        """
+        Build the header of the projected database reached by the hyperlinks.
+
+        Return the rows (item, support, hyperlinks) of the locally frequent
+        items and the queue holding their hyperlinks. The given queue is
+        reused when it is large enough, otherwise a new one is allocated.
+        """
+        #Gathering the positions of the projected items following every hyperlink of the row
+        lengths = self.ends[pointers] - pointers - 1
+        total = int(lengths.sum())
+        if total == 0:
+            return [], queue
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.arange(total, dtype=np.int32) + np.repeat(pointers + 1 - offsets, lengths)
+        items = self.cell[positions]
+
+        #Keeping only those items which have support greater than min_support
+        occurrences = np.bincount(items)
+        counts = occurrences
+        if self.weights is not None:
+            counts = np.bincount(items, weights=self.cell_weights(positions))
+        frequent = np.flatnonzero(counts >= self.minSupport)
+        if len(frequent) == 0:
+            return [], queue
+        keep = counts[items] >= self.minSupport
+        positions = positions[keep]
+        order = np.argsort(items[keep], kind='stable')
+
+        if queue is None or len(queue) < len(order):
+            queue = np.empty(len(order), dtype=positions.dtype)
+        queue[:len(order)] = positions[order]
+        supports = counts[frequent]
+        sizes = occurrences[frequent]
+        starts = np.cumsum(sizes) - sizes
+        return [(int(x), int(c), queue[s:s + n])
+                for x, c, n, s in zip(frequent, supports, sizes, starts)], queue
+
+    def expand(self, unit):
+        """
+        Split a work unit into the work units of its projected database.
+        """
+        prefix, item, support, pointers = unit
+        prefix = prefix + (item,)
+        return [(prefix, x, c, links.copy()) for x, c, links in self.project(pointers)[0]]
+
+    def pattern(self, prefix):
+        """
+        Decode a prefix of ranks into a pattern key.
+        """
+        return tuple(sorted(self.flist[r] for r in prefix))
+
+
+def mine_unit(hstruct, unit, patterns=None, budget=None):
+    """
+    Mine a work unit without recursion and return its patterns.
+
+    The header tables under the unit are kept on an explicit stack and the
+    prefix is a growable list, so neither the pattern length nor the depth
+    of the search is bounded by a buffer or by the recursion limit. A
+    MiningBudget is charged for every pattern and may stop the unit.
+    """
+    if patterns is None:
+        patterns = {}
+    prefix = list(unit[0])
+    base = len(prefix)
+    # Hyperlink queues for every depth of the stack. A queue is reused by
+    # every header built at its depth and only grows when it is too small.
+    queues = []
+    stack = [iter([unit[1:]])]
+
+    while stack:
+        row = next(stack[-1], None)
+        if row is None:
+            stack.pop()
+            continue
+
+        depth = len(stack)
+        item, support, pointers = row
+        del prefix[base + depth - 1:]
+        prefix.append(item)
+        patterns[hstruct.pattern(prefix)] = support
+        if budget is not None:
+            budget.add(1)
+
+        if len(queues) < depth:
+            queues.append(None)
+        newRowlist, queues[depth - 1] = hstruct.project(pointers, queues[depth - 1])
+        if newRowlist:
+            stack.append(iter(newRowlist))
+
+    return patterns
+
+
+def schedule_units(hstruct, units, workers, patterns):
+    """
+    Split the largest work units until the work is balanced across workers.
+
+    A unit is expanded into its child units while its projected database is
+    larger than a quarter of a fair share. The pattern of every expanded
+    unit is written to patterns, since it is no longer mined by a worker.
+    """
+    sizes = [hstruct.projected_size(unit[3]) for unit in units]
+    limit = sum(sizes) / (4 * workers)
+    heap = [(-size, i, unit) for i, (size, unit) in enumerate(zip(sizes, units))]
+    heapq.heapify(heap)
+    counter = len(heap)
+    while heap and -heap[0][0] > limit:
+        _, _, unit = heapq.heappop(heap)
+        prefix, item, support, pointers = unit
+        patterns[hstruct.pattern(prefix + (item,))] = support
+        for child in hstruct.expand(unit):
+            heapq.heappush(heap, (-hstruct.projected_size(child[3]), counter, child))
+            counter += 1
+    return [unit for _, _, unit in sorted(heap)]
+
+
+_worker_hstruct = None
+
+def _init_worker(hstruct):
+    global _worker_hstruct
+    _worker_hstruct = hstruct
+
+def _mine_worker_unit(unit):
+    return mine_unit(_worker_hstruct, unit)
+
+
+def find_frequent_patterns(datalist, minSupport, workers=1, weighted=False, threads=1):
     #print("Data Mininging begins using H-mine algorithm...")
-    # The minimum support is calculated using the ceil function. 
-    # min_support which is passed to this algorithm is in precentage(%). This is converted to number of transactions.
-    
-    #out_frequents_items = []                # Frequent Items generated by H-Mine are appended one by one to this list
-    itemsetBuffer = [None] * 200            # This buffer variable is used to store the Items under recursion to generate the final frequent-itemset
-    mapItemToSupport = {}   #This Dictionary will be used to store the support values of all the unique items in input dataset
-    mapItemRow = {} #This Dict will help us build the H-Struct table.
+    # min_support which is passed to this algorithm is the absolute number of transactions.
+    # With workers > 1 the work units are mined by a process pool of that size, and with
+    # threads > 1 by a thread pool of that size sharing the read-only H-struct, which avoids
+    # pickling it to every process. Threads run in parallel on free-threaded Python; the NumPy
+    # projections also release the GIL.
+    # With weighted=True, datalist holds (transaction, count) pairs, e.g. from load_weighted_transactions.
+
+    workers = workers or 1
+    threads = threads or 1
+    if workers > 1 and threads > 1:
+        raise ValueError("workers and threads cannot both be above 1")
+
+    hstruct = HStruct(datalist, minSupport, weighted)
     final_patterns = {}
+    units = hstruct.root_units()
 
-     # This function is used to generate frequent items using values in itemsetBuffer and prefixlen and apped that value to output list out_frequents_items
-    def writeOut (prefix, prefixlen, item, support):
-        freq = []
-        for val in range(prefixlen):
-            freq.append(prefix[val])
-        freq.append(item)
-
-        out_set = ()
-        for val in freq:
-            out_set = out_set + (val,)
-
-        keys = out_set
-        keys = tuple(sorted(keys))
-        final_patterns[keys] = support
-
-    # Creating Class called Row to store the itemsets objects in form item, support of item, item pointer
-    class Row:
-        def __init__(self, item):
-            self.item = item
-            self.support = 0
-            self.pointer = []
-
-
-    #Building mapItemToSupport Dictionary with Unique Items in input dataset and it's support value
-    for tran in datalist:
-        for item in tran:
-            if item not in mapItemToSupport.keys(): 
-                mapItemToSupport[item] = 1
-            else : 
-                mapItemToSupport[item] += 1
-
-    rowlist=[]      #This acts as a Header table storing the list of row objects
-
-    for keys in mapItemToSupport.keys():
-        if mapItemToSupport[keys] >= minSupport:
-            rowItem = Row(keys);
-            rowItem.support = mapItemToSupport[keys]
-            rowlist.append(rowItem)
-            mapItemRow[keys] = rowItem
-
-    # This is used to find the frequent-item cell of the database.
-    # All the other frequent-itemsets will be found using this cell.
-
-    cell = []   #This variable stores all the frequent projections in all the transactions seperated by -1
-
-    flist = sorted(mapItemRow.keys()) # f-list of frequent itemsets in sorted order
-
-    idx = 0
-    #This loop is used to append frequent projections in Cell list and append their respective pointers in mapItemRow dictionary 
-    for tran in datalist:
-        temp=[]
-        for item in tran:
-            if item in flist:
-                if item not in temp: # checking double occurences in the list
-                    temp.append(item)
-
-        if temp:
-            temp = sorted(temp, key = lambda x: mapItemToSupport[x])
-            for x in temp:
-                cell.append(x)
-                mapItemRow[x].pointer.append(idx)
-                idx += 1
-            cell.append(-1)
-            idx += 1
-
-
-    # This function impletements this logic for H-mine algorithm and is called recursively 
-    def hmine(prefix=[], prefixlen=0, rowlist=[]):
-
-        for row in rowlist: #Traversing the header table (rowlist)
-            newRowlist=[]
-            mapItemRow.clear()
-
-            #traversing all pointers of row object in row list and building new recursive sub-level header
-            for pointer in row.pointer:
-                pointer+=1
-
-                if cell[pointer]==-1:
-                    continue;
-
-                #Generating the row objects and incresing the support for all the unique items in row objects    
-                while cell[pointer] != -1 :
-                    item=cell[pointer]
-                    if mapItemRow.get(item,None) == None :
-                        rowItem = Row(item)
-                        rowItem.support = 1
-                        rowItem.pointer.append(pointer)
-                        mapItemRow[item] = rowItem
-
-                    else:    
-                        mapItemRow[item].support += 1
-                        mapItemRow[item].pointer.append(pointer)
-
-                    pointer += 1
-
-            #Appending only those row objects which have support greater than min_support
-            for entry in mapItemRow:
-                currentRow = mapItemRow[entry]
-                if currentRow.support >= minSupport:
-                    newRowlist.append(currentRow)
-
-            #Calling writeOut function to generate the frequent items and store in output list
-            writeOut(itemsetBuffer, prefixlen, row.item, row.support)
-
-            #Sorting newRowlist in lexical order
-            if len(newRowlist) != 0 :
-                newRowlist = sorted(newRowlist, key = lambda x : x.support)
-
-
-                #Store current row item in buffer before recursion so that it can be used to build the frequent itemset values    
-                itemsetBuffer[prefixlen] = row.item
-
-                hmine(prefix, prefixlen+1, newRowlist)      #recursively calling Hmine algorithm
-        
+    if workers <= 1 and threads <= 1:
+        for unit in units:
+            mine_unit(hstruct, unit, final_patterns)
+        return final_patterns
+
+    units = schedule_units(hstruct, units, max(workers, threads), final_patterns)
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for patterns in executor.map(lambda unit: mine_unit(hstruct, unit), units):
+                final_patterns.update(patterns)
+        return final_patterns
 
-    hmine(itemsetBuffer, 0, rowlist)  #Calling Hmine algorithm for first time using empty Buffer and 0 as prefixlength and initial value of rowlist Header.
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(hstruct,)) as executor:
+        for patterns in executor.map(_mine_worker_unit, units):
+            final_patterns.update(patterns)
 
     #itemset_count = len(final_patterns) # Total number of frequent_items for given input_file dataset
     return final_patterns
 
 
+def find_frequent_patterns_budgeted(datalist, minSupport, time_budget=None, max_patterns=None,
+                                    weighted=False):
+    # Anytime H-Mine: the work units are mined from the most to the least frequent item and
+    # mining stops cleanly once time_budget seconds have passed or max_patterns patterns were
+    # produced. A unit holds every pattern whose least frequent item is the unit's item, so the
+    # patterns of completed units are final. Returns (patterns, report).
+
+    budget = MiningBudget(time_budget, max_patterns)
+    hstruct = HStruct(datalist, minSupport, weighted)
+    units = hstruct.root_units()[::-1]
+    final_patterns = {}
+    completed = []
+    reason = None
+
+    try:
+        for unit in units:
+            final_patterns.update(mine_unit(hstruct, unit, budget=budget))
+            completed.append(hstruct.flist[unit[1]])
+    except BudgetExceeded as e:
+        reason = e.reason
+
+    pending = [hstruct.flist[unit[1]] for unit in units[len(completed):]]
+    return final_patterns, budget.report(reason, completed, pending)
+
+
     #print(f'Data Mining completed using H-Mine algorithm')
     #print("End of Program")
     
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dominant_tree_algo import DominantTree, PatternConstraints
+
+logger = logging.getLogger(__name__)
+
+
+def _mine_snapshot(snapshot, threshold, constraints):
+    """
+    Rebuild a snapshot of the maintained tree and mine it. Runs in the
+    executor, away from the ingest loop.
+    """
+    tree = DominantTree.from_snapshot(snapshot, constraints)
+    return tree.mine_incremental(threshold)
+
+
+class IngestService():
+    """
+    Asyncio service that keeps an incremental DominantTree of a basket
+    stream and serves the patterns of its latest mining run.
+
+    Baskets are lines of space separated items, as in the .dat files. They
+    arrive through submit, a Unix socket (serve_socket) or a growing file
+    (tail_file). The batcher collects them into micro-batches of up to
+    batch_size baskets or batch_interval seconds, encodes the items as
+    integer ids and inserts the batch into the tree.
+
+    The tree is re-mined every refresh_interval seconds, or sooner once the
+    item counts have changed by change_ratio of their total since the last
+    run. Mining runs on a snapshot of the tree in executor (a single worker
+    process by default), so ingest carries on meanwhile, and latest keeps
+    returning the previous result until the new one is ready. The snapshot
+    is taken in a thread while inserts wait, so the loop keeps accepting
+    baskets. A failed run is logged and recorded under "Error" in the
+    summary; latest then still returns the previous patterns.
+    min_support is relative to the number of baskets at snapshot time.
+    """
+    def __init__(self, min_support, batch_size=1000, batch_interval=0.5, refresh_interval=30.0,
+                 change_ratio=0.1, constraints=None, executor=None):
+        self.min_support = min_support
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.refresh_interval = refresh_interval
+        self.change_ratio = change_ratio
+        self.constraints = constraints or PatternConstraints()
+        self.executor = executor
+        self._own_executor = executor is None
+
+        self.ids = {}
+        self.names = []
+        self.tree = DominantTree.incremental()
+        self.transaction_count = 0
+        self.item_total = 0
+        self.changed = 0
+
+        self.patterns = {}
+        self.info = {"Generation": 0, "Transactions": 0, "Threshold": None, "Mined At": None,
+                     "Error": None}
+        self.queue = asyncio.Queue()
+        self._tree_lock = asyncio.Lock()
+        self.tasks = []
+        self.servers = []
+        self._mining = None
+        self._last_refresh = time.monotonic()
+
+    def latest(self):
+        """
+        The patterns of the latest completed mining run and a summary of it.
+        """
+        return self.patterns, dict(self.info)
+
+    def submit(self, basket):
+        """
+        Queue one basket, a list of items.
+        """
+        self.queue.put_nowait(basket)
+
+    async def start(self):
+        """
+        Start the batcher and the refresh timer.
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=1)
+        self.tasks.append(asyncio.create_task(self._batcher()))
+        self.tasks.append(asyncio.create_task(self._timer()))
+
+    async def stop(self):
+        """
+        Stop ingesting, close the servers and wait for a running mining job.
+        """
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self._mining is not None:
+            await asyncio.gather(self._mining, return_exceptions=True)
+        if self._own_executor and self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    async def serve_socket(self, path):
+        """
+        Accept baskets, one per line, on a Unix socket at path.
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self._handle_connection, path)
+        self.servers.append(server)
+        return server
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            async for line in reader:
+                items = line.decode().split()
+                if items:
+                    self.queue.put_nowait(items)
+        finally:
+            writer.close()
+
+    async def tail_file(self, file_path, from_start=True, poll_interval=0.5):
+        """
+        Follow a .dat file as it grows, like tail -f. A line is only taken
+        once its newline has been written.
+        """
+        with open(file_path, 'rb') as f:
+            if not from_start:
+                f.seek(0, os.SEEK_END)
+            rest = b''
+            while True:
+                chunk = f.read(1 << 20)
+                if not chunk:
+                    await asyncio.sleep(poll_interval)
+                    continue
+                lines = (rest + chunk).split(b'\n')
+                rest = lines.pop()
+                for line in lines:
+                    items = line.decode().split()
+                    if items:
+                        self.queue.put_nowait(items)
+                await asyncio.sleep(0)
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            async with self._tree_lock:
+                self._insert(batch)
+            if self.changed >= self.change_ratio * max(1, self.item_total - self.changed):
+                self.refresh()
+
+    def _insert(self, batch):
+        ids = self.ids
+        names = self.names
+        exclude = self.constraints.exclude
+        encoded = []
+        for basket in batch:
+            row = []
+            for item in basket:
+                if item in exclude:
+                    continue
+                item_id = ids.get(item)
+                if item_id is None:
+                    item_id = ids[item] = len(names)
+                    names.append(item)
+                row.append(item_id)
+            encoded.append(row)
+            self.changed += len(set(row))
+            self.item_total += len(set(row))
+        self.tree.insert_batch(encoded)
+        self.transaction_count += len(batch)
+
+    async def _timer(self):
+        while True:
+            wait = self._last_refresh + self.refresh_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            mining = self.refresh()
+            if mining is not None:
+                # A run already in progress delays the next one.
+                await asyncio.gather(mining, return_exceptions=True)
+
+    def refresh(self):
+        """
+        Start mining a snapshot of the tree unless a run is in progress.
+        """
+        if self._mining is not None and not self._mining.done():
+            return self._mining
+        self._last_refresh = time.monotonic()
+        self.changed = 0
+        if self.transaction_count == 0:
+            return None
+        self._mining = asyncio.create_task(self._mine())
+        return self._mining
+
+    async def _mine(self):
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._tree_lock:
+                count = self.transaction_count
+                # The tree holds item ids and no excluded items.
+                constraints = self.constraints
+                must_include = [self.ids[x] for x in constraints.must_include if x in self.ids]
+                snapshot = None
+                # Until a required item has been seen, nothing can match.
+                if must_include or not constraints.must_include:
+                    snapshot = await loop.run_in_executor(None, self.tree.snapshot)
+            threshold = self.min_support * count
+            patterns = {}
+            if snapshot is not None:
+                constraints = PatternConstraints(constraints.max_length, constraints.min_length,
+                                                 must_include)
+                patterns = await loop.run_in_executor(self.executor, _mine_snapshot,
+                                                      snapshot, threshold, constraints)
+        except Exception as e:
+            logger.exception("Mining run failed; serving the previous patterns")
+            self.info["Error"] = repr(e)
+            return None
+        names = self.names
+        self.patterns = {tuple(sorted(names[i] for i in key)): value
+                         for key, value in patterns.items()}
+        self.info = {"Generation": self.info["Generation"] + 1, "Transactions": count,
+                     "Threshold": threshold, "Mined At": time.time(), "Error": None}
+        return self.patterns
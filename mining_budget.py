@@ -0,0 +1,57 @@
+import threading
+import time
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised inside a miner when its time or output budget runs out.
+    """
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class MiningBudget():
+    """
+    Time and output limits of an anytime mining run.
+
+    time_budget is in seconds from the creation of the budget and
+    max_patterns caps the number of patterns produced. Either may be None.
+    Miners call add() as they produce patterns and check() between units of
+    work; both raise BudgetExceeded once a limit is reached. A budget may be
+    shared by the threads of one run.
+    """
+    def __init__(self, time_budget=None, max_patterns=None):
+        self.start = time.perf_counter()
+        self.deadline = None if time_budget is None else self.start + time_budget
+        self.max_patterns = max_patterns
+        self.patterns = 0
+        self._lock = threading.Lock()
+
+    def check(self):
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise BudgetExceeded("time")
+        if self.max_patterns is not None and self.patterns >= self.max_patterns:
+            raise BudgetExceeded("patterns")
+
+    def add(self, count):
+        with self._lock:
+            self.patterns += count
+        self.check()
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def report(self, reason, completed, pending):
+        """
+        Summary of a run: why it stopped (None when it finished) and which
+        items' conditional trees or work units were completed.
+        """
+        return {
+            "Complete": reason is None,
+            "Stopped By": reason,
+            "Elapsed (Seconds)": self.elapsed(),
+            "Patterns Produced": self.patterns,
+            "Completed Items": list(completed),
+            "Pending Items": list(pending),
+        }
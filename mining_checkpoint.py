@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import pickle
+
+
+def dataset_fingerprint(dataset):
+    """
+    Identity of a dataset for a checkpoint: the path, size and modification
+    time of a .dat file, or a SHA-256 of the transactions of a list.
+    """
+    if isinstance(dataset, str):
+        stat = os.stat(dataset)
+        return f"{os.path.abspath(dataset)}|{stat.st_size}|{stat.st_mtime_ns}"
+    sha = hashlib.sha256()
+    for transaction in dataset:
+        sha.update(repr(transaction).encode())
+        sha.update(b"\n")
+    return sha.hexdigest()
+
+
+class MiningCheckpoint():
+    """
+    On-disk state of a resumable mining run.
+
+    directory holds three files:
+    - state.json, the key of the run: the dataset fingerprint and the
+      mining parameters. A checkpoint with another key is discarded;
+    - tree.pkl, the built top-level tree (see DominantTree.snapshot);
+    - items.pkl, an append-only log with one (item, patterns) record per
+      completed item.
+    Files are replaced atomically and every record is flushed to disk as
+    it is written. A crash can only leave a torn record at the end of the
+    log, which is cut off on load, so that item is simply mined again.
+    With resume=False any earlier checkpoint is discarded.
+    """
+    def __init__(self, directory, key, resume=True):
+        self.directory = directory
+        self.state_path = os.path.join(directory, "state.json")
+        self.tree_path = os.path.join(directory, "tree.pkl")
+        self.log_path = os.path.join(directory, "items.pkl")
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = None
+        if not resume or state != {"key": key}:
+            self.clear()
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"key": key}, f)
+            os.replace(tmp, self.state_path)
+
+    def clear(self):
+        """
+        Remove the saved tree and completed items.
+        """
+        for path in (self.tree_path, self.log_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def load_tree(self):
+        """
+        The saved tree snapshot, or None.
+        """
+        try:
+            with open(self.tree_path, "rb") as f:
+                return pickle.load(f)
+        except OSError:
+            return None
+
+    def save_tree(self, snapshot):
+        tmp = self.tree_path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.tree_path)
+
+    def completed(self):
+        """
+        The (item, patterns) records of the completed items.
+        """
+        records = []
+        if not os.path.exists(self.log_path):
+            return records
+        with open(self.log_path, "r+b") as f:
+            end = 0
+            while True:
+                try:
+                    records.append(pickle.load(f))
+                except (EOFError, pickle.UnpicklingError, ValueError, TypeError):
+                    break
+                end = f.tell()
+            # Drop a record torn by a crash.
+            f.truncate(end)
+        return records
+
+    def add(self, item, patterns):
+        """
+        Record the patterns of a completed item.
+        """
+        with open(self.log_path, "ab") as f:
+            pickle.dump((item, patterns), f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,265 @@
+import itertools
+
+import numpy as np
+
+# The dense layout is used while the triangle of pair counts stays below
+# this many cells and transactions hold a fair share of the items.
+DENSE_MAX_CELLS = 1 << 24
+DENSE_MIN_DENSITY = 0.05
+# Memory for the two float64 incidence matrices of a dense chunk, and for
+# a band of rows of their product; chunks and bands of many items are
+# split into fewer rows to stay within it.
+DENSE_CHUNK_BYTES = 1 << 26
+
+
+class PairCounts():
+    """
+    Exact co-occurrence counts of every pair of the given items.
+
+    transactions are (transaction, count) pairs and items maps the counted
+    items to their supports. Items are numbered by descending support.
+    The counts are computed with NumPy in chunks of chunk_size transactions:
+    - "dense" keeps the upper triangle of the count matrix as a flat int64
+      array and counts each chunk as a product of its incidence matrix, in
+      blocks of transactions and bands of items that fit DENSE_CHUNK_BYTES,
+      added straight into the triangle;
+    - "sparse" keeps only the pairs that occur, as sorted pair codes and
+      their counts, which suits retail-like data with many items.
+    "auto" picks dense when the triangle is small and transactions are
+    long relative to the number of items.
+    """
+    def __init__(self, transactions, items, layout="auto", chunk_size=1 << 16):
+        self.order = sorted(items, key=lambda item: (-items[item], item))
+        self.rank = {item: r for r, item in enumerate(self.order)}
+        self._partners = {}
+        n = len(self.order)
+        cells = n * (n - 1) // 2
+
+        transactions = iter(transactions)
+        chunks = iter(lambda: list(itertools.islice(transactions, chunk_size)), [])
+        if layout == "auto":
+            first = next(chunks, [])
+            weight = sum(count for _, count in first)
+            length = sum(count * len(self._ranks(t)) for t, count in first)
+            density = length / weight / n if weight and n else 0.0
+            layout = "dense" if cells <= DENSE_MAX_CELLS and density >= DENSE_MIN_DENSITY else "sparse"
+            chunks = itertools.chain([first], chunks)
+        if layout not in ("dense", "sparse"):
+            raise ValueError("layout must be 'auto', 'dense' or 'sparse'")
+        self.layout = layout
+
+        if layout == "dense":
+            counts = np.zeros(cells, dtype=np.int64)
+            rows = max(1, DENSE_CHUNK_BYTES // (16 * max(1, n)))
+            for chunk in chunks:
+                for start in range(0, len(chunk), rows):
+                    self._count_dense(chunk[start:start + rows], n, rows, counts)
+            self.counts = counts
+        else:
+            keys = np.empty(0, dtype=np.int64)
+            values = np.empty(0, dtype=np.int64)
+            for chunk in chunks:
+                chunk_keys, chunk_values = self._count_sparse(chunk, n)
+                keys, inverse = np.unique(np.concatenate([keys, chunk_keys]), return_inverse=True)
+                values = np.bincount(inverse, np.concatenate([values, chunk_values]),
+                                     len(keys)).astype(np.int64)
+            self.keys = keys
+            self.counts = values
+
+    def _ranks(self, transaction):
+        rank = self.rank
+        return sorted({rank[x] for x in transaction if x in rank})
+
+    def _count_dense(self, block, n, rows, counts):
+        """
+        Add the pair counts of a block of transactions to the flat triangle
+        counts, as products of its incidence matrix over bands of rows items.
+        """
+        incidence = np.zeros((len(block), n))
+        weights = np.empty(len(block))
+        for row, (transaction, count) in enumerate(block):
+            incidence[row, self._ranks(transaction)] = 1.0
+            weights[row] = count
+        weighted = incidence * weights[:, None]
+        columns = np.arange(n)
+        for low in range(0, n, rows):
+            high = min(n, low + rows)
+            # Counts stay exact in float64 far beyond any dataset here. The
+            # cells right of the diagonal for items low to high are one run
+            # of the triangle, in order.
+            product = incidence[:, low:high].T @ weighted
+            upper = columns[None, :] > columns[low:high, None]
+            counts[_offset(low, n):_offset(high, n)] += product[upper].astype(np.int64)
+
+    def _count_sparse(self, chunk, n):
+        """
+        Pair codes i * n + j (i < j) of a chunk and their counts.
+        Transactions of the same length are stacked so their pairs are
+        enumerated with one fancy index.
+        """
+        by_length = {}
+        for transaction, count in chunk:
+            ranks = self._ranks(transaction)
+            if len(ranks) > 1:
+                rows, weights = by_length.setdefault(len(ranks), ([], []))
+                rows.append(ranks)
+                weights.append(count)
+
+        codes, weights = [], []
+        for length, (rows, counts) in by_length.items():
+            rows = np.array(rows, dtype=np.int64)
+            first, second = np.triu_indices(length, 1)
+            codes.append((rows[:, first] * n + rows[:, second]).ravel())
+            weights.append(np.repeat(np.array(counts, dtype=np.int64), len(first)))
+        if not codes:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        keys, inverse = np.unique(np.concatenate(codes), return_inverse=True)
+        return keys, np.bincount(inverse, np.concatenate(weights), len(keys)).astype(np.int64)
+
+    def _pairs(self, positions):
+        """
+        Rank pairs (i, j), i < j, of the given positions in self.counts.
+        """
+        n = len(self.order)
+        if self.layout == "dense":
+            starts = _offset(np.arange(n), n)
+            first = np.searchsorted(starts, positions, side="right") - 1
+            return first, positions - starts[first] + first + 1
+        keys = self.keys[positions]
+        return keys // n, keys % n
+
+    def support(self, a, b):
+        """
+        Number of transactions holding both items (0 for uncounted items).
+        """
+        if a not in self.rank or b not in self.rank or a == b:
+            return 0
+        i, j = sorted((self.rank[a], self.rank[b]))
+        n = len(self.order)
+        if self.layout == "dense":
+            return int(self.counts[_offset(i, n) + j - i - 1])
+        code = i * n + j
+        pos = np.searchsorted(self.keys, code)
+        if pos < len(self.keys) and self.keys[pos] == code:
+            return int(self.counts[pos])
+        return 0
+
+    def frequent_pairs(self, threshold):
+        """
+        All 2-itemsets with support of at least threshold, as pattern keys.
+        """
+        frequent = np.nonzero(self.counts >= threshold)[0]
+        first, second = self._pairs(frequent)
+        order = self.order
+        return {tuple(sorted((order[i], order[j]))): int(count)
+                for i, j, count in zip(first.tolist(), second.tolist(), self.counts[frequent].tolist())}
+
+    def partners(self, threshold):
+        """
+        Map every item to the set of items it forms a frequent pair with.
+        The result is cached per threshold.
+        """
+        partners = self._partners.get(threshold)
+        if partners is None:
+            partners = {item: set() for item in self.order}
+            first, second = self._pairs(np.nonzero(self.counts >= threshold)[0])
+            order = self.order
+            for i, j in zip(first.tolist(), second.tolist()):
+                partners[order[i]].add(order[j])
+                partners[order[j]].add(order[i])
+            self._partners[threshold] = partners
+        return partners
+
+
+def _offset(i, n):
+    """
+    Position of the first pair of row i in the flat upper triangle of n items.
+    """
+    return i * (2 * n - i - 1) // 2
+
+
+def _bucket(first, second, num_buckets):
+    """
+    Hash bucket of the item id pairs (first[k], second[k]), first < second.
+    """
+    return (first * 0x9E3779B1 + second * 0x85EBCA77) % num_buckets
+
+
+def _group_by_length(rows, weights):
+    """
+    Stack the id rows of equal length into 2-d arrays. Yields the length,
+    the row indices, the stacked ids and their weights.
+    """
+    by_length = {}
+    for index, row in enumerate(rows):
+        if len(row) > 1:
+            by_length.setdefault(len(row), []).append(index)
+    for length, indices in by_length.items():
+        yield length, indices, np.array([rows[i] for i in indices], dtype=np.int64), \
+            np.array([weights[i] for i in indices], dtype=np.int64)
+
+
+def hash_pair_filter(transactions, threshold, num_buckets=1 << 20, chunk_size=1 << 16):
+    """
+    PCY/DHP pre-filter for tree construction.
+
+    The first pass counts the single items and, in the same pass, hashes
+    every pair of items of every transaction into num_buckets counters,
+    with items encoded as integer ids and the pairs of a chunk hashed with
+    NumPy. A pair can only be frequent if both of its items are frequent
+    and its bucket reached threshold. The second pass trims every
+    transaction to the items that take part in at least one such pair
+    within it. Every frequent itemset of two or more items keeps all of its
+    transactions, so its support is unchanged.
+
+    transactions are (transaction, count) pairs. Returns the supports of
+    the frequent single items and the trimmed transactions, as
+    (transaction, count) pairs with empty ones left out.
+    """
+    transactions = list(transactions)
+    ids = {}
+    item_counts = np.zeros(0, dtype=np.int64)
+    buckets = np.zeros(num_buckets, dtype=np.int64)
+
+    for start in range(0, len(transactions), chunk_size):
+        chunk = transactions[start:start + chunk_size]
+        rows = [sorted({ids.setdefault(x, len(ids)) for x in transaction}) for transaction, _ in chunk]
+        weights = [count for _, count in chunk]
+
+        flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64)
+        repeats = np.repeat(np.array(weights, dtype=np.int64), [len(row) for row in rows])
+        counts = np.bincount(flat, repeats, len(ids)).astype(np.int64)
+        counts[:len(item_counts)] += item_counts
+        item_counts = counts
+
+        for length, _, stacked, row_weights in _group_by_length(rows, weights):
+            first, second = np.triu_indices(length, 1)
+            hashed = _bucket(stacked[:, first], stacked[:, second], num_buckets)
+            buckets += np.bincount(hashed.ravel(), np.repeat(row_weights, len(first)),
+                                   num_buckets).astype(np.int64)
+
+    names = list(ids)
+    frequent = {names[i]: int(item_counts[i]) for i in np.nonzero(item_counts >= threshold)[0]}
+
+    trimmed = []
+    for start in range(0, len(transactions), chunk_size):
+        chunk = transactions[start:start + chunk_size]
+        rows = [sorted(ids[x] for x in set(transaction) if x in frequent) for transaction, _ in chunk]
+        weights = [count for _, count in chunk]
+        kept = [None] * len(chunk)
+        for length, indices, stacked, _ in _group_by_length(rows, weights):
+            first, second = np.triu_indices(length, 1)
+            passed = buckets[_bucket(stacked[:, first], stacked[:, second], num_buckets)] >= threshold
+            # Position k of a row is kept if any passing pair holds it.
+            rows, pairs = np.nonzero(passed)
+            keep = np.zeros((len(indices), length), dtype=bool)
+            keep[rows, first[pairs]] = True
+            keep[rows, second[pairs]] = True
+            for index, row, mask in zip(indices, stacked, keep):
+                if mask.any():
+                    kept[index] = [names[i] for i in row[mask]]
+        # The transactions keep their order, which the DominantTree build
+        # depends on.
+        trimmed.extend((items, count) for items, count in zip(kept, weights) if items)
+
+    return frequent, trimmed
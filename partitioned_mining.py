@@ -0,0 +1,73 @@
+import math
+import os
+
+from candidate_counting import downward_closure, verify_candidates
+from dataset_io import count_transactions, load_weighted_transactions, run_tasks, split_byte_ranges
+from dominant_tree_algo import DominantTree
+
+# Rough ratio between the memory a loaded partition takes as Python lists
+# of strings (plus its tree) and its size on disk.
+MEMORY_PER_FILE_BYTE = 40
+
+
+def _count_range(args):
+    file_path, start, end = args
+    return count_transactions(file_path, start, end)
+
+
+def _mine_partition(args):
+    """
+    Load one partition, collapsing duplicate baskets, and return the
+    patterns it holds at the scaled threshold, as a list of itemsets.
+    SON needs every locally frequent itemset, so the tree is built under
+    one fixed item order, which mines them all.
+    """
+    file_path, start, end, relative_support = args
+    transactions = load_weighted_transactions(file_path, start, end)
+    if not transactions:
+        return []
+    local_threshold = relative_support * sum(count for _, count in transactions)
+    tree = DominantTree.parallel(transactions, local_threshold, 1, True)
+    return list(tree.mine_patterns(local_threshold).keys())
+
+
+def find_frequent_patterns_partitioned(file_path, support_threshold,
+                                       memory_budget=256 * 1024 * 1024, workers=1):
+    """
+    SON (partitioned) mining of a .dat file that does not fit in memory.
+
+    The file is split into byte-range partitions small enough to load
+    within memory_budget. Each partition is mined with a fixed-order
+    DominantTree at the support threshold scaled to its share of the
+    transactions. The union of the local patterns is the candidate set, and
+    a second streaming pass counts the exact global support of every
+    candidate. With workers > 1 the partitions are mined and counted by a
+    process pool, so peak memory is about workers * memory_budget.
+
+    support_threshold is an absolute count on the whole file.
+    """
+    size = os.path.getsize(file_path)
+    parts = max(workers, math.ceil(size * MEMORY_PER_FILE_BYTE / memory_budget))
+    ranges = split_byte_ranges(file_path, parts)
+
+    total = sum(run_tasks(_count_range, [(file_path, start, end) for start, end in ranges], workers))
+    if total == 0:
+        return {}
+    relative_support = support_threshold / total
+
+    # Phase 1: local mining of every partition.
+    candidates = set()
+    tasks = [(file_path, start, end, relative_support) for start, end in ranges]
+    for local_patterns in run_tasks(_mine_partition, tasks, workers):
+        candidates.update(local_patterns)
+    candidates = downward_closure(candidates)
+
+    # Phase 2: exact global supports. Single items are always counted.
+    longer = [c for c in candidates if len(c) > 1]
+    supports, item_counts = verify_candidates(file_path, longer, workers)
+
+    patterns = {(item,): count for item, count in item_counts.items() if count >= support_threshold}
+    for candidate, count in supports.items():
+        if count >= support_threshold:
+            patterns[candidate] = count
+    return patterns
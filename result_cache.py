@@ -0,0 +1,180 @@
+import hashlib
+import importlib
+import json
+import os
+import pickle
+import time
+
+from dataset_io import load_weighted_transactions
+
+# Mining modules by algorithm name. Each provides find_frequent_patterns
+# and generate_association_rules.
+ALGORITHMS = {
+    "dominant_tree": "dominant_tree_algo",
+    "fp_growth": "fp_growth_algo",
+    "enhanced_fp_growth": "enhanced_fp_growth_algo",
+    "h_mine": "h_mine_algo",
+}
+
+# Algorithms that find every pattern with its exact support, so their
+# result at a lower support can be filtered to answer a higher one. The
+# other miners leave out some patterns (the dominant-node build of
+# DominantTree, and FP-growth the single item of a branching conditional
+# tree), and which ones depends on the support.
+EXACT_ALGORITHMS = {"h_mine"}
+
+
+class ResultCache():
+    """
+    Persistent cache of mining results.
+
+    Results are stored as pickle files in directory and keyed by a content
+    hash of the input file, the algorithm, its parameters and the
+    thresholds. The cache is capped at max_bytes; the least recently used
+    results are evicted first. For the exact miners (EXACT_ALGORITHMS),
+    patterns mined at support s also answer any support above s by
+    filtering.
+    """
+    def __init__(self, directory=".pattern_cache", max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {"entries": {}, "fingerprints": {}}
+
+    def _save_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_path)
+
+    def fingerprint(self, file_path):
+        """
+        SHA-256 of the file contents. The hash is remembered for the file's
+        path, size and modification time, so unchanged files are hashed once.
+        """
+        stat = os.stat(file_path)
+        path = os.path.abspath(file_path)
+        stamp = f"{path}|{stat.st_size}|{stat.st_mtime_ns}"
+        fingerprints = self.index["fingerprints"]
+        digest = fingerprints.get(stamp)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(block)
+            digest = sha.hexdigest()
+            # Forget the hashes of older versions of the file.
+            for old in [s for s in fingerprints if s.rsplit("|", 2)[0] == path]:
+                del fingerprints[old]
+            fingerprints[stamp] = digest
+            self._save_index()
+        return digest
+
+    @staticmethod
+    def _key(kind, digest, algorithm, params, *thresholds):
+        return json.dumps([kind, digest, algorithm, params or {}] + list(thresholds), sort_keys=True)
+
+    def _load(self, key):
+        entry = self.index["entries"][key]
+        with open(os.path.join(self.directory, entry["file"]), "rb") as f:
+            result = pickle.load(f)
+        entry["last_used"] = time.time()
+        self._save_index()
+        return result
+
+    def _store(self, key, result):
+        name = hashlib.sha1(key.encode()).hexdigest() + ".pkl"
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+        self.index["entries"][key] = {"file": name, "bytes": os.path.getsize(path),
+                                      "last_used": time.time()}
+        self._evict()
+        self._save_index()
+
+    def _evict(self):
+        """
+        Remove least recently used results until the cache fits max_bytes.
+        """
+        entries = self.index["entries"]
+        total = sum(entry["bytes"] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entries[key]["bytes"]
+            try:
+                os.remove(os.path.join(self.directory, entries[key]["file"]))
+            except OSError:
+                pass
+            del entries[key]
+
+    def clear(self):
+        """
+        Remove every cached result.
+        """
+        for entry in self.index["entries"].values():
+            try:
+                os.remove(os.path.join(self.directory, entry["file"]))
+            except OSError:
+                pass
+        self.index["entries"] = {}
+        self._save_index()
+
+    def find_frequent_patterns(self, file_path, support_threshold, algorithm="dominant_tree", params=None):
+        """
+        Patterns of a .dat file, from the cache when possible.
+
+        An exact hit is returned as is. Otherwise, for an exact miner, the
+        cached result with the highest support not above support_threshold
+        is filtered. On a miss the file is mined and the result stored.
+        params are extra keyword arguments of the miner and are part of the
+        key.
+        """
+        digest = self.fingerprint(file_path)
+        key = self._key("patterns", digest, algorithm, params, support_threshold)
+        if key in self.index["entries"]:
+            return self._load(key)
+
+        best, best_support = None, None
+        for other in self.index["entries"] if algorithm in EXACT_ALGORITHMS else ():
+            parts = json.loads(other)
+            if parts[0] != "patterns":
+                continue
+            _, other_digest, other_algorithm, other_params, support = parts
+            if other_digest == digest and other_algorithm == algorithm \
+                    and other_params == (params or {}) and support <= support_threshold \
+                    and (best_support is None or support > best_support):
+                best, best_support = other, support
+        if best is not None:
+            patterns = self._load(best)
+            return {k: v for k, v in patterns.items() if v >= support_threshold}
+
+        module = importlib.import_module(ALGORITHMS[algorithm])
+        transactions = load_weighted_transactions(file_path)
+        patterns = module.find_frequent_patterns(transactions, support_threshold, weighted=True,
+                                                 **(params or {}))
+        self._store(key, patterns)
+        return patterns
+
+    def generate_association_rules(self, file_path, support_threshold, confidence_threshold,
+                                   algorithm="dominant_tree", params=None):
+        """
+        Association rules of a .dat file, from the cache when possible.
+        Missing rules are generated from the (possibly cached) patterns.
+        """
+        digest = self.fingerprint(file_path)
+        key = self._key("rules", digest, algorithm, params, support_threshold, confidence_threshold)
+        if key in self.index["entries"]:
+            return self._load(key)
+
+        module = importlib.import_module(ALGORITHMS[algorithm])
+        patterns = self.find_frequent_patterns(file_path, support_threshold, algorithm, params)
+        rules = module.generate_association_rules(patterns, confidence_threshold)
+        self._store(key, rules)
+        return rules
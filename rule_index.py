@@ -0,0 +1,247 @@
+import math
+import os
+import struct
+import zipfile
+from bisect import bisect_left
+
+import numpy as np
+
+
+def _map_npz(file_path):
+    """
+    Memory-map the arrays of an uncompressed .npz file, as written by
+    np.savez, instead of reading them.
+    """
+    arrays = {}
+    with zipfile.ZipFile(file_path) as archive, open(file_path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"'{file_path}' is compressed and cannot be mapped")
+            # Skip the local file header to the .npy member.
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", f.read(4))
+            f.seek(name_length + extra_length, os.SEEK_CUR)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-len(".npy")]
+            if math.prod(shape) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(f, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                                         order="F" if fortran else "C")
+    return arrays
+
+
+class RuleIndex():
+    """
+    Serving index over association rules.
+
+    rules is the output of generate_association_rules: antecedent ->
+    (consequent, confidence). The antecedents are compiled into a trie over
+    integer item ids, each antecedent spelled in ascending id order, so a
+    basket query only walks the trie nodes whose antecedent is a subset of
+    the basket instead of testing every rule. With the patterns the rules
+    came from and the number of transactions, rules are also scored by
+    lift; otherwise their lift is nan.
+
+    The trie is held in flat NumPy arrays: the edges of every node in CSR
+    form, sorted by item, and the rule of every node. Queries run on these
+    arrays directly, so load only maps them from the file saved by save.
+    """
+    def __init__(self, rules=None, patterns=None, transaction_count=None):
+        rules = rules or {}
+        names = sorted({item for antecedent, (consequent, _) in rules.items()
+                        for item in antecedent + tuple(consequent)})
+        self.names = names
+        self.ids = {item: i for i, item in enumerate(names)}
+        children = [{}]
+        node_rule = [-1]
+        consequents = []
+        confidences = []
+        lifts = []
+
+        for antecedent, (consequent, confidence) in rules.items():
+            node = 0
+            for item_id in sorted(self.ids[item] for item in antecedent):
+                child = children[node].get(item_id)
+                if child is None:
+                    child = len(children)
+                    children[node][item_id] = child
+                    children.append({})
+                    node_rule.append(-1)
+                node = child
+            node_rule[node] = len(consequents)
+            consequents.append(sorted(self.ids[item] for item in consequent))
+            confidences.append(confidence)
+            support = patterns.get(tuple(sorted(consequent))) if patterns else None
+            if support and transaction_count:
+                lifts.append(confidence * transaction_count / support)
+            else:
+                lifts.append(math.nan)
+
+        edges = [sorted(below.items()) for below in children]
+        self._set_arrays({
+            "edge_offsets": _offsets(edges),
+            "edge_items": np.array([i for below in edges for i, _ in below], dtype=np.int64),
+            "edge_children": np.array([c for below in edges for _, c in below], dtype=np.int64),
+            "node_rule": np.array(node_rule, dtype=np.int64),
+            "consequent_offsets": _offsets(consequents),
+            "consequent_items": np.array([i for c in consequents for i in c], dtype=np.int64),
+            "confidence": np.array(confidences, dtype=np.float64),
+            "lift": np.array(lifts, dtype=np.float64),
+        })
+
+    def _set_arrays(self, arrays):
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self._views = tuple(_view(arrays[name], "q") for name in
+                            ("edge_offsets", "edge_items", "edge_children", "node_rule",
+                             "consequent_offsets", "consequent_items"))
+        self._scores = {"confidence": _view(arrays["confidence"], "d"),
+                        "lift": _view(arrays["lift"], "d")}
+        self._parents = None
+
+    def __len__(self):
+        return len(self.confidence)
+
+    def _score(self, by):
+        if by not in self._scores:
+            raise ValueError("by must be 'confidence' or 'lift'")
+        return self._scores[by]
+
+    def matching(self, basket):
+        """
+        Indices of the rules whose antecedent is contained in basket.
+        """
+        ids = sorted({self.ids[item] for item in basket if item in self.ids})
+        offsets, items, children, node_rule = self._views[:4]
+        found = []
+        stack = [(0, 0)]
+        while stack:
+            node, start = stack.pop()
+            low, high = offsets[node], offsets[node + 1]
+            # Both the basket ids and the edges are sorted, so the search
+            # only moves forward.
+            for i in range(start, len(ids)):
+                low = bisect_left(items, ids[i], low, high)
+                if low == high:
+                    break
+                if items[low] == ids[i]:
+                    child = children[low]
+                    if node_rule[child] >= 0:
+                        found.append(node_rule[child])
+                    stack.append((child, i + 1))
+                    low += 1
+        return found
+
+    def _consequent_ids(self, rule):
+        offsets, items = self._views[4:]
+        return items[offsets[rule]:offsets[rule + 1]]
+
+    def query(self, basket, k=None, by="confidence"):
+        """
+        The rules that fire for basket, best first by confidence or lift,
+        as (antecedent, consequent, confidence, lift) tuples. Rules whose
+        consequent is already in the basket are left out. Returns at most k
+        rules when k is given.
+        """
+        score = self._score(by)
+        basket_ids = {self.ids[item] for item in basket if item in self.ids}
+        fired = [r for r in self.matching(basket)
+                 if not basket_ids.issuperset(self._consequent_ids(r))]
+        fired.sort(key=lambda r: -score[r] if score[r] == score[r] else math.inf)
+        if k is not None:
+            fired = fired[:k]
+        confidence, lift = self._scores["confidence"], self._scores["lift"]
+        return [(self.antecedent(r), self.consequent(r), confidence[r], lift[r]) for r in fired]
+
+    def recommend(self, basket, k=10, by="confidence"):
+        """
+        Items not in basket, ranked by the best rule recommending them, as
+        (item, score) pairs.
+        """
+        score = self._score(by)
+        basket_ids = {self.ids[item] for item in basket if item in self.ids}
+        best = {}
+        for r in self.matching(basket):
+            value = score[r]
+            if value != value:
+                continue
+            for item_id in self._consequent_ids(r):
+                if item_id not in basket_ids and value > best.get(item_id, -math.inf):
+                    best[item_id] = value
+        ranked = sorted(best.items(), key=lambda pair: (-pair[1], pair[0]))[:k]
+        return [(self.names[item_id], value) for item_id, value in ranked]
+
+    def query_batch(self, baskets, k=None, by="confidence"):
+        return [self.query(basket, k, by) for basket in baskets]
+
+    def recommend_batch(self, baskets, k=10, by="confidence"):
+        return [self.recommend(basket, k, by) for basket in baskets]
+
+    def antecedent(self, rule):
+        """
+        Antecedent of a rule, rebuilt from the trie parent links.
+        """
+        if self._parents is None:
+            nodes = len(self.node_rule)
+            parents = np.full(nodes, -1, dtype=np.int64)
+            parent_items = np.full(nodes, -1, dtype=np.int64)
+            parents[self.edge_children] = np.repeat(np.arange(nodes), np.diff(self.edge_offsets))
+            parent_items[self.edge_children] = self.edge_items
+            rule_node = np.empty(len(self), dtype=np.int64)
+            with_rule = np.flatnonzero(np.asarray(self.node_rule) >= 0)
+            rule_node[np.asarray(self.node_rule)[with_rule]] = with_rule
+            self._parents = (_view(parents, "q"), _view(parent_items, "q"), _view(rule_node, "q"))
+        parents, parent_items, rule_node = self._parents
+        items = []
+        node = rule_node[rule]
+        while node > 0:
+            items.append(self.names[parent_items[node]])
+            node = parents[node]
+        return tuple(sorted(items))
+
+    def consequent(self, rule):
+        return tuple(sorted(self.names[item_id] for item_id in self._consequent_ids(rule)))
+
+    def save(self, file_path):
+        """
+        Write the index as an uncompressed .npz of its arrays and item names.
+        """
+        with open(file_path, "wb") as f:
+            np.savez(f, names=np.array(self.names, dtype=str), edge_offsets=self.edge_offsets,
+                     edge_items=self.edge_items, edge_children=self.edge_children,
+                     node_rule=self.node_rule, consequent_offsets=self.consequent_offsets,
+                     consequent_items=self.consequent_items, confidence=self.confidence,
+                     lift=self.lift)
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Map an index written by save. Only the item names are read; the
+        trie and rule arrays stay on disk until queries touch them.
+        """
+        index = cls.__new__(cls)
+        arrays = _map_npz(file_path)
+        index.names = arrays.pop("names").tolist()
+        index.ids = {item: i for i, item in enumerate(index.names)}
+        index._set_arrays(arrays)
+        return index
+
+
+def _view(array, typecode):
+    """
+    An array as a memoryview of typecode ("q" for int64, "d" for float64),
+    whose items are plain Python numbers for the query loops.
+    """
+    dtype = np.int64 if typecode == "q" else np.float64
+    return memoryview(np.ascontiguousarray(array, dtype=dtype)).cast("B").cast(typecode)
+
+
+def _offsets(lists):
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(values) for values in lists])
+    return offsets
@@ -0,0 +1,73 @@
+import random
+from collections import Counter
+
+from candidate_counting import downward_closure, negative_border, verify_candidates
+from dataset_evaluation import profile_dataset
+from dominant_tree_algo import DominantTree
+
+
+def find_frequent_patterns_sampled(dataset, support_threshold, sample_size=10000,
+                                   lowering=0.8, seed=None, workers=1):
+    """
+    Toivonen-style mining: mine a random sample at a lowered threshold,
+    then verify the result with one pass over the full dataset. The sample
+    tree is built under one fixed item order (DominantTree.parallel in a
+    single process), which mines every pattern of the sample.
+
+    dataset is a list of transactions or the path of a .dat file, and
+    support_threshold is an absolute count on the full dataset. The sample
+    threshold is the proportional threshold scaled by lowering. Every
+    returned support is exact. The verification pass also counts the
+    negative border of the sample result; if a border itemset turns out to
+    be frequent, some of its supersets may have been missed and the report
+    says the result is not complete.
+
+    Returns (patterns, report).
+    """
+    rng = random.Random(seed)
+    if isinstance(dataset, str):
+        total, _, _, sample = profile_dataset(dataset, workers, sample_size=sample_size, seed=seed)
+    else:
+        total = len(dataset)
+        sample = list(dataset) if sample_size >= total else rng.sample(dataset, sample_size)
+
+    if total == 0:
+        return {}, {"Sample Size": 0, "Sample Threshold": 0, "Candidates": 0,
+                    "Negative Border": 0, "Frequent Border Itemsets": [], "Complete": True}
+
+    sample_threshold = support_threshold * len(sample) / total * lowering
+
+    # Frequent itemsets of the sample, closed downward so that the
+    # negative border is well defined.
+    sample_items = Counter()
+    for transaction in sample:
+        sample_items.update(set(transaction))
+    mined = DominantTree.parallel(sample, sample_threshold, 1).mine_patterns(sample_threshold)
+    candidates = downward_closure(
+        list(mined) + [(item,) for item, count in sample_items.items() if count >= sample_threshold])
+    border = negative_border(candidates, sample_items)
+
+    # Single items are counted for every transaction anyway, so only the
+    # longer itemsets are passed as candidates.
+    longer = [c for c in candidates | border if len(c) > 1]
+    supports, item_counts = verify_candidates(dataset, longer, workers)
+    for item, count in item_counts.items():
+        supports[(item,)] = count
+
+    patterns = {c: supports.get(c, 0) for c in candidates if supports.get(c, 0) >= support_threshold}
+
+    # Items never seen in the sample are on the border as well.
+    unseen = [(item,) for item in item_counts if (item,) not in candidates and (item,) not in border]
+    missed = [c for c in list(border) + unseen if supports.get(c, 0) >= support_threshold]
+    for itemset in missed:
+        patterns[itemset] = supports[itemset]
+
+    report = {
+        "Sample Size": len(sample),
+        "Sample Threshold": sample_threshold,
+        "Candidates": len(candidates),
+        "Negative Border": len(border) + len(unseen),
+        "Frequent Border Itemsets": missed,
+        "Complete": not missed,
+    }
+    return patterns, report
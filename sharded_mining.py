@@ -0,0 +1,219 @@
+import heapq
+import math
+import multiprocessing
+import os
+import traceback
+from collections import Counter
+from multiprocessing.connection import Client, Listener
+
+from dataset_io import iter_transactions
+from dominant_tree_algo import DominantTree, PatternConstraints
+from tree_core import weighted_transactions
+
+
+def serve_worker(address, authkey):
+    """
+    Worker side of sharded mining. Connects to the coordinator at address
+    and serves it until told to stop:
+    - ("shard", rows) adds weighted rows of item ids to the local shard;
+      duplicate rows are collapsed, so memory follows the distinct rows of
+      the shard;
+    - ("mine", threshold, items, constraints) mines the conditional trees
+      of items from the shard and replies ("patterns", patterns), or
+      ("error", traceback) if mining failed;
+    - ("stop",), or the coordinator closing its end, ends the worker.
+    Run this on every worker node of a SocketTransport.
+    """
+    with Client(address, authkey=authkey) as connection:
+        shard = Counter()
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, ConnectionError):
+                return
+            if message[0] == "shard":
+                for row, count in message[1]:
+                    shard[row] += count
+            elif message[0] == "mine":
+                _, threshold, items, constraints = message
+                try:
+                    connection.send(("patterns", _mine_shard(shard, threshold, items, constraints)))
+                except Exception:
+                    connection.send(("error", traceback.format_exc()))
+                shard = Counter()
+            else:
+                return
+
+
+def _mine_shard(shard, threshold, items, constraints):
+    """
+    Mine the conditional trees of items from a shard. Item ids are ranks of
+    the global order, so the tree is built in ascending id order. A pattern
+    is then only reached from its last item in that order, which belongs to
+    exactly one group.
+    """
+    transactions = list(shard.items())
+    shard.clear()
+    if not transactions:
+        return {}
+    ids = sorted({item for row, _ in transactions for item in row})
+    tree = DominantTree.parallel(transactions, threshold, 1, True, constraints, order=ids)
+    patterns = {}
+    for _, item_patterns in tree.mine_items([x for x in items if x in tree.frequent], threshold):
+        patterns.update(item_patterns)
+    return patterns
+
+
+class SocketTransport():
+    """
+    Coordinator side of the sharded mining transport. It listens on
+    address, a (host, port) pair, for workers started with serve_worker on
+    any node, and waits until workers of them have connected. Messages are
+    pickled, so the workers must share authkey.
+    """
+    def __init__(self, address, authkey, workers):
+        self.address = address
+        self.authkey = authkey
+        self.workers = workers
+        self.listener = None
+
+    def connect(self):
+        """
+        Open the listener and return one connection per worker.
+        """
+        self.listener = Listener(self.address, authkey=self.authkey)
+        self.address = self.listener.address
+        self.start_workers()
+        return [self.listener.accept() for _ in range(self.workers)]
+
+    def start_workers(self):
+        """
+        Remote workers are started by the deployment, not here.
+        """
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+
+
+class LocalTransport(SocketTransport):
+    """
+    Socket transport over localhost whose workers are local processes, for
+    running sharded mining on one machine.
+    """
+    def __init__(self, workers):
+        super().__init__(("localhost", 0), os.urandom(16), workers)
+        self.processes = []
+
+    def start_workers(self):
+        for _ in range(self.workers):
+            process = multiprocessing.Process(target=serve_worker,
+                                              args=(self.address, self.authkey), daemon=True)
+            process.start()
+            self.processes.append(process)
+
+    def close(self):
+        super().close()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+
+
+def _weighted_source(dataset, weighted):
+    if isinstance(dataset, str):
+        return ((transaction, 1) for transaction in iter_transactions(dataset))
+    return dataset if weighted else weighted_transactions(dataset)
+
+
+def assign_groups(supports, groups):
+    """
+    Split the items, given as id -> support with ids ranked by descending
+    support, into groups of about equal mining cost. The conditional tree
+    of an item grows with its support and with its rank, which bounds the
+    length of its prefix paths; items are placed greedily, largest cost
+    first, into the cheapest group so far.
+    """
+    heap = [(0.0, g) for g in range(groups)]
+    assignment = {}
+    costs = {item: support * math.log2(item + 2) for item, support in supports.items()}
+    for item in sorted(costs, key=costs.get, reverse=True):
+        load, g = heapq.heappop(heap)
+        assignment[item] = g
+        heapq.heappush(heap, (load + costs[item], g))
+    return assignment
+
+
+def find_frequent_patterns_sharded(dataset, support_threshold, transport=None, workers=2,
+                                   weighted=False, max_length=None, min_length=1,
+                                   must_include=None, exclude=None, batch_size=10000):
+    """
+    Item-parallel (PFP-style) mining of a list of transactions or a .dat
+    file across the workers of a transport.
+
+    A first pass counts the items and fixes one global order of the
+    frequent ones. The items are split into one group per worker (see
+    assign_groups). A second pass ships every transaction, as item ids in
+    that order, to the workers of its groups: the worker of group g gets
+    the prefix up to the last item of g, which holds every pattern whose
+    last item is in g. Each worker builds a DominantTree of its shard alone
+    and mines the conditional trees of its group's items; the coordinator
+    joins the disjoint results. The coordinator keeps only the item counts
+    and batch_size rows per group, and a worker only its shard.
+
+    transport defaults to a LocalTransport of workers processes; a
+    SocketTransport spreads the work over several nodes.
+    """
+    constraints = PatternConstraints(max_length, min_length, must_include, exclude)
+    supports = Counter()
+    for transaction, count in _weighted_source(dataset, weighted):
+        for item in set(transaction):
+            supports[item] += count
+    names = sorted((item for item, count in supports.items()
+                    if count >= support_threshold and item not in constraints.exclude),
+                   key=lambda item: (-supports[item], item))
+    ids = {item: i for i, item in enumerate(names)}
+    if constraints.must_include and constraints.must_include.isdisjoint(ids):
+        return {}
+    local_constraints = PatternConstraints(max_length, min_length,
+                                           [ids[x] for x in constraints.must_include if x in ids])
+
+    transport = transport or LocalTransport(workers)
+    connections = []
+    try:
+        connections = transport.connect()
+        group_of = assign_groups({i: supports[item] for i, item in enumerate(names)},
+                                 len(connections))
+        buffers = [[] for _ in connections]
+        for transaction, count in _weighted_source(dataset, weighted):
+            row = sorted({ids[x] for x in transaction if x in ids})
+            sent = set()
+            for end in range(len(row), 0, -1):
+                g = group_of[row[end - 1]]
+                if g not in sent:
+                    sent.add(g)
+                    buffers[g].append((tuple(row[:end]), count))
+                    if len(buffers[g]) >= batch_size:
+                        connections[g].send(("shard", buffers[g]))
+                        buffers[g] = []
+
+        for g, connection in enumerate(connections):
+            if buffers[g]:
+                connection.send(("shard", buffers[g]))
+            items = [i for i in range(len(names)) if group_of[i] == g]
+            connection.send(("mine", support_threshold, items, local_constraints))
+
+        patterns = {}
+        for connection in connections:
+            reply = connection.recv()
+            if reply[0] == "error":
+                raise RuntimeError("Sharded mining worker failed:\n" + reply[1])
+            for key, support in reply[1].items():
+                patterns[tuple(sorted(names[i] for i in key))] = support
+        for connection in connections:
+            connection.send(("stop",))
+    finally:
+        for connection in connections:
+            connection.close()
+        transport.close()
+    return patterns
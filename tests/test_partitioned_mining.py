@@ -0,0 +1,39 @@
+import os
+import random
+
+import pytest
+
+import h_mine_algo
+from partitioned_mining import find_frequent_patterns_partitioned
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _write(path, transactions):
+    with open(path, "w") as f:
+        for transaction in transactions:
+            f.write(" ".join(transaction) + "\n")
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("memory_budget", [256 * 1024 * 1024, 2000])
+def test_matches_h_mine_on_random_data(tmp_path, seed, memory_budget):
+    rng = random.Random(seed)
+    transactions = [rng.sample("abcdefghij", rng.randint(1, 7)) for _ in range(200)]
+    threshold = rng.randint(10, 60)
+    path = str(tmp_path / "random.dat")
+    _write(path, transactions)
+
+    expected = h_mine_algo.find_frequent_patterns(transactions, threshold)
+    assert find_frequent_patterns_partitioned(path, threshold, memory_budget) == expected
+
+
+def test_matches_h_mine_on_chess():
+    path = os.path.join(ROOT, "chess.dat")
+    with open(path) as f:
+        transactions = [line.split() for line in f]
+    threshold = 0.8 * len(transactions)
+
+    patterns = find_frequent_patterns_partitioned(path, threshold)
+    assert len(patterns) == 8227
+    assert patterns == h_mine_algo.find_frequent_patterns(transactions, threshold)
@@ -0,0 +1,17 @@
+import os
+
+import h_mine_algo
+from sampling_mining import find_frequent_patterns_sampled
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_sample_result_is_complete_on_chess():
+    path = os.path.join(ROOT, "chess.dat")
+    with open(path) as f:
+        transactions = [line.split() for line in f]
+    threshold = 0.8 * len(transactions)
+
+    patterns, report = find_frequent_patterns_sampled(path, threshold, sample_size=800, seed=0)
+    assert report["Complete"]
+    assert patterns == h_mine_algo.find_frequent_patterns(transactions, threshold)
@@ -0,0 +1,25 @@
+import random
+
+import pytest
+
+import h_mine_algo
+from dominant_tree_algo import DominantTree, find_frequent_patterns
+
+
+def test_spliced_items_do_not_form_a_single_path():
+    transactions = [["a"]] * 2 + [["b"]] * 2 + [["a", "b"]]
+    assert find_frequent_patterns(transactions, 3, prune=True) == {("a",): 3, ("b",): 3}
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_pruning_keeps_the_patterns(seed):
+    rng = random.Random(seed)
+    transactions = [rng.sample("abcdefgh", rng.randint(1, 8)) for _ in range(rng.randint(1, 25))]
+    threshold = rng.randint(1, max(1, len(transactions) // 2))
+
+    assert find_frequent_patterns(transactions, threshold, prune=True) == \
+        find_frequent_patterns(transactions, threshold)
+
+    tree = DominantTree.parallel(transactions, threshold, 1)
+    tree.root = tree.tree_pruning(tree.root, threshold)
+    assert tree.mine_patterns(threshold) == h_mine_algo.find_frequent_patterns(transactions, threshold)
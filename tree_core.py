@@ -0,0 +1,220 @@
+class TreeNode():
+    """
+    A node of a prefix tree.
+
+    Nodes use __slots__ to stay compact, and children are kept in a dict
+    keyed by item so finding a child is a hash lookup instead of a scan.
+    path caches the node's own prefix path (see cached_prefix_path).
+    """
+    __slots__ = ('name', 'count', 'parent', 'children', 'path')
+
+    def __init__(self, name, count, parent):
+        """
+        Create the node.
+        """
+        self.name = name
+        self.count = count
+        self.parent = parent
+        self.children = {}
+        self.path = None
+
+    @property
+    def value(self):
+        """
+        The item of the node (FP-growth naming).
+        """
+        return self.name
+
+    def inc(self, numOccur):
+        self.count += numOccur
+
+    def dec(self, numOccur):
+        self.count -= numOccur
+
+    def has_child(self, name):
+        """
+        Check if node has a particular child node.
+        """
+        return name in self.children
+
+    def get_child(self, name):
+        """
+        Return a child node with a particular item, or None.
+        """
+        return self.children.get(name)
+
+    def add_child(self, name, count=1):
+        """
+        Add a node as a child node.
+        """
+        child = TreeNode(name, count, self)
+        self.children[name] = child
+        return child
+
+    def disp(self, ind=1):
+        print ('  '*ind, self.name, ' ', self.count)
+        for child in self.children.values():
+            child.disp(ind+1)
+
+
+class HeaderTable(dict):
+    """
+    Header table of a prefix tree: item -> list of the nodes holding it.
+
+    Appending a node is O(1), and the nodes of an item are kept in the
+    order they were created.
+    """
+    def link(self, node):
+        """
+        Add a node to the node list of its item.
+        """
+        nodes = self.get(node.name)
+        if nodes is None:
+            self[node.name] = [node]
+        else:
+            nodes.append(node)
+
+
+def weighted_transactions(transactions):
+    """
+    Pair every transaction with a count of 1.
+    """
+    return [(transaction, 1) for transaction in transactions]
+
+
+def find_frequent_items(transactions, threshold):
+    """
+    Create a dictionary of items with occurrences above the threshold.
+    transactions are (transaction, count) pairs.
+    """
+    items = {}
+
+    for transaction, count in transactions:
+        for item in transaction:
+            if item in items:
+                items[item] += count
+            else:
+                items[item] = count
+
+    for key in list(items.keys()):
+        if items[key] < threshold:
+            del items[key]
+
+    return items
+
+
+def insert_transaction(root, items, count, headers):
+    """
+    Insert an ordered list of items below root, adding count to every node
+    on its path. New nodes are linked into the header table.
+    """
+    node = root
+    for item in items:
+        child = node.children.get(item)
+        if child is None:
+            child = TreeNode(item, count, node)
+            node.children[item] = child
+            headers.link(child)
+        else:
+            child.count += count
+        node = child
+    return node
+
+
+def prefix_path(node):
+    """
+    Return the items on the path from the parent of node up to (excluding)
+    the root, nearest first.
+    """
+    path = []
+    parent = node.parent
+    while parent.parent is not None:
+        path.append(parent.name)
+        parent = parent.parent
+    return path
+
+
+def tree_has_single_path(node):
+    """
+    If there is a single path below node,
+    return True, else return False.
+    """
+    while True:
+        num_children = len(node.children)
+        if num_children > 1:
+            return False
+        elif num_children == 0:
+            return True
+        node = next(iter(node.children.values()))
+
+
+def flatten_tree(root, nodes=None):
+    """
+    Encode the tree below root as three preorder lists: the index of each
+    node's parent (-1 for children of root), its item and its count. The
+    lists pickle far more compactly than linked nodes. When nodes is a
+    list, the nodes are appended to it in the same order.
+    """
+    parents, items, counts = [], [], []
+    stack = [(child, -1) for child in root.children.values()]
+    while stack:
+        node, parent = stack.pop()
+        index = len(items)
+        parents.append(parent)
+        items.append(node.name)
+        counts.append(node.count)
+        if nodes is not None:
+            nodes.append(node)
+        stack.extend((child, index) for child in node.children.values())
+    return parents, items, counts
+
+
+def merge_flat_tree(root, flat, headers):
+    """
+    Merge a tree encoded by flatten_tree into the tree below root, node by
+    node: counts of nodes on shared paths are summed, and new nodes are
+    created and linked into the header table. Returns the merged nodes, in
+    the order of flat.
+    """
+    parents, items, counts = flat
+    nodes = []
+    for parent, item, count in zip(parents, items, counts):
+        above = root if parent < 0 else nodes[parent]
+        node = above.children.get(item)
+        if node is None:
+            node = TreeNode(item, count, above)
+            above.children[item] = node
+            headers.link(node)
+        else:
+            node.count += count
+        nodes.append(node)
+    return nodes
+
+
+
+
+def cached_prefix_path(node):
+    """
+    prefix_path as a tuple, memoized on the nodes.
+
+    Only the ancestors whose path is not cached yet are walked, and each
+    one's path is its item followed by its parent's cached path, so shared
+    upper parts of the tree are walked once per tree instead of once per
+    node below them, and nodes below the same parent share one tuple.
+    Cached paths stay valid as nodes are added, but not if nodes are
+    moved to another parent.
+    """
+    parent = node.parent
+    chain = []
+    while parent.parent is not None:
+        path = parent.path
+        if path is not None:
+            break
+        chain.append(parent)
+        parent = parent.parent
+    else:
+        path = ()
+    for ancestor in reversed(chain):
+        path = (ancestor.name,) + path
+        ancestor.path = path
+    return path